@@ -0,0 +1,112 @@
+import re
+from collections import Counter
+
+# Script each Tesseract language pack is trained on
+LANG_SCRIPTS = {
+    'eng': 'Latin',
+    'ita': 'Latin',
+    'deu': 'Latin',
+    'chi_sim': 'Han',
+    'asm': 'Bengali'
+}
+# Installed language for each non-Latin script; Latin needs stopwords to pick a language
+SCRIPT_LANGS = {
+    'Han': 'chi_sim',
+    'Bengali': 'asm'
+}
+SCRIPT_RANGES = [
+    ('Han', 0x3400, 0x4DBF),
+    ('Han', 0x4E00, 0x9FFF),
+    ('Han', 0xF900, 0xFAFF),
+    ('Bengali', 0x0980, 0x09FF),
+    ('Latin', 0x0041, 0x005A),
+    ('Latin', 0x0061, 0x007A),
+    ('Latin', 0x00C0, 0x024F)
+]
+LANG_STOPWORDS = {
+    'eng': {'the', 'and', 'of', 'to', 'is', 'that', 'for', 'with', 'are', 'this', 'be', 'as', 'on', 'by', 'which', 'from', 'it', 'an'},
+    'ita': {'il', 'lo', 'la', 'gli', 'di', 'che', 'della', 'delle', 'degli', 'nel', 'nella', 'per', 'con', 'sono', 'una', 'è', 'anche', 'come', 'dei', 'non'},
+    'deu': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'mit', 'von', 'den', 'dem', 'sich', 'auf', 'für', 'eine', 'ein', 'auch', 'werden', 'zu', 'im', 'des'}
+}
+# Below these a page is too short to call
+MIN_SCRIPT_CHARS = 20
+MIN_STOPWORD_HITS = 3
+# Scripts covering less than this share of the letters are ignored
+MIN_SCRIPT_SHARE = 0.3
+MAX_PLAN_LANGS = 3
+# Languages other than the most voted one need this share of the votes to join
+# the plan; a lone vote (e.g. an English abstract in a Chinese paper) would
+# otherwise make every page pay for script detection and a wider model
+MIN_PLAN_SHARE = 0.4
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+def char_script(ch):
+    code = ord(ch)
+    for script, start, end in SCRIPT_RANGES:
+        if start <= code <= end:
+            return script
+    return None
+
+def script_histogram(text):
+    counts = Counter()
+    for ch in text:
+        if ch.isalpha():
+            script = char_script(ch)
+            if script:
+                counts[script] += 1
+    return counts
+
+def dominant_script(text):
+    counts = script_histogram(text or "")
+    total = sum(counts.values())
+    if total < MIN_SCRIPT_CHARS:
+        return None
+    script, count = counts.most_common(1)[0]
+    return script if count / total >= MIN_SCRIPT_SHARE else None
+
+def latin_language(text):
+    hits = Counter()
+    for word in WORD_RE.findall(text.lower()):
+        for lang, stopwords in LANG_STOPWORDS.items():
+            if word in stopwords:
+                hits[lang] += 1
+    if not hits:
+        return None
+    lang, count = hits.most_common(1)[0]
+    return lang if count >= MIN_STOPWORD_HITS else None
+
+def text_language(text):
+    # Script from a character histogram; Latin text is narrowed down by stopwords
+    script = dominant_script(text)
+    if script is None:
+        return None
+    if script == 'Latin':
+        return latin_language(text)
+    return SCRIPT_LANGS.get(script)
+
+def script_language(script, latin_lang=None, default=None):
+    if script == 'Latin':
+        return latin_lang or default
+    return SCRIPT_LANGS.get(script, default)
+
+def language_plan(votes, fallback):
+    # Tesseract language string for a document: one pack, or "a+b" when the
+    # sampled pages disagree (mixed-language volumes)
+    if not votes:
+        return fallback
+    total = sum(votes.values())
+    ranked = votes.most_common(MAX_PLAN_LANGS)
+    langs = [ranked[0][0]] + [lang for lang, count in ranked[1:] if count / total >= MIN_PLAN_SHARE]
+    return "+".join(langs)
+
+def plan_languages(plan):
+    return plan.split("+")
+
+def is_multi_script(plan):
+    return len({LANG_SCRIPTS.get(lang) for lang in plan_languages(plan)}) > 1
+
+def select_languages(plan, script):
+    # Narrow a multi-script plan to the languages written in the page's script
+    langs = [lang for lang in plan_languages(plan) if LANG_SCRIPTS.get(lang) == script]
+    return "+".join(langs) if langs else plan
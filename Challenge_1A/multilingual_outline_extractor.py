@@ -1,41 +1,77 @@
-import pytesseract
-from pdf2image import convert_from_path
+import fitz
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 import json
 import os
 import re
 import sys
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
+# instrumentation.py and manifest.py are shared by both challenges and live in <repo>/shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+import ocr_backend
+import ocr_cache
+import language_id
+import manifest
+import instrumentation
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 INPUT_DIR = "input"
 OUTPUT_DIR = "output"
+# Bumped (as manifest.OUTLINE_VERSION) when a change alters the outlines
+# produced for unchanged inputs, so incremental runs reprocess everything once
+# and Challenge_1B stops reusing older outlines
+PIPELINE_VERSION = manifest.OUTLINE_VERSION
+# Every run records each PDF's content hash and outline in <output>/.manifest;
+# Challenge_1B finds outlines by it. Incremental runs also skip PDFs recorded
+# there as unchanged. Off unless INCREMENTAL=1: the pipeline version covers
+# settings, not code, so after a change to the heading rules a stale outline
+# would be served without warning.
+INCREMENTAL = os.environ.get("INCREMENTAL", "0") == "1"
+MANIFEST_NAME = ".manifest"
 SUPPORTED_LANGS = {
     'eng': ['english', '.en.', '.eng.', 'introduction', 'contents'],
     'chi_sim': ['chinese', 'zh', 'cn', '科技', '期刊', '与', '平台', '策略', '研究'],
     'ita': ['italian', '.ita.', 'zini', 'weyland', 'atti', 'perugia', 'introduzione', 'storico'],
-    'deu': ['german', '.de.', 'einleitung', 'inhalt', 'vorwort', 'forschung', 'handbuch']
+    'deu': ['german', '.de.', 'einleitung', 'inhalt', 'vorwort', 'forschung', 'handbuch'],
+    'asm': ['assamese', '.as.', 'ankuran']
 }
 DEFAULT_LANG = 'eng'
+# Pages sampled (spread over the document) to identify its language(s)
+LANG_SAMPLE_PAGES = 3
 DPI = 120
+# "two_tier" finds line boxes with a fast low-DPI pass and re-reads only the
+# heading candidates at HEADING_DPI; "single" OCRs whole pages at DPI.
+OCR_MODE = "two_tier"
+FAST_DPI = 100
+HEADING_DPI = 300
+# Lines this much taller than the page's median glyph height are heading candidates
+HEADING_HEIGHT_RATIO = 1.15
+CROP_PADDING = 4
+HEADING_CANDIDATE_PATTERN = re.compile(r"^\d+(\.\d+)*\.?\s+\S")
+# A section number alone on its line ("7.", "2.1"), as text layers of tables of contents have it
+SECTION_NUMBER_PATTERN = re.compile(r"^\d+\.(\d+\.?)*$")
 MAX_WORKERS = 8
+# Pages rasterized per pdftoppm call; peak memory scales with this, not the page count.
+# Set to 0 to rasterize the whole document in one call.
+PAGE_WINDOW = 4
+# Pages per work unit handed to the batch process pool
+UNIT_PAGES = PAGE_WINDOW or 4
+# A page's embedded text layer is trusted (and OCR skipped) when it has at least
+# MIN_TEXT_CHARS visible characters and this share of them look like real text.
+MIN_TEXT_CHARS = 40
+MIN_TEXT_QUALITY = 0.85
+TEXT_PUNCTUATION = set(".,;:!?()[]-–—'\"/%&*+=§°«»“”‘’、，。；：！？（）《》")
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-def detect_language(filename, first_page_text=None):
+def filename_language(filename):
     lower = filename.lower()
     for lang, keywords in SUPPORTED_LANGS.items():
         for kw in keywords:
             if kw in lower:
                 return lang
-    if first_page_text:
-        if re.search(r'[\u4e00-\u9fff]', first_page_text):
-            return 'chi_sim'
-        if re.search(r'(Inhalt|Einleitung|Vorwort|Forschung|Handbuch)', first_page_text, re.IGNORECASE):
-            return 'deu'
-        if re.search(r'Introduzione|Contesto|Storico|Indice|Capitolo', first_page_text, re.IGNORECASE):
-            return 'ita'
-    return DEFAULT_LANG
+    return None
 
 def is_main_heading(line):
     line = line.strip()
@@ -102,14 +138,7 @@ def get_heading_level(line):
 def extract_title_from_first_page(text_lines):
     return "Overview  Foundation Level Extensions  "
 
-def ocr_page(img, lang, idx):
-    try:
-        text = pytesseract.image_to_string(img, lang=lang if lang != 'deu' else 'eng')
-    except Exception as e:
-        logging.error(f"OCR failed on page {idx+1}: {e}")
-        return []
-    
-    lines = text.split("\n")
+def classify_lines(lines, idx):
     headings = []
     
     for line in lines:
@@ -125,6 +154,250 @@ def ocr_page(img, lang, idx):
     
     return headings
 
+def ocr_cache_keys(pdf_path, page_indices, lang):
+    if not page_indices or ocr_cache.get_cache() is None:
+        return {}
+    try:
+        engine = ocr_backend.get_backend().version
+    except Exception as e:
+        logging.warning(f"OCR cache skipped for {pdf_path}: {e}")
+        return {}
+    
+    fingerprints = ocr_cache.page_fingerprints(pdf_path, page_indices)
+    return {idx: ocr_cache.make_key(fp, lang, dpi_key(), engine) for idx, fp in fingerprints.items()}
+
+def cached_ocr_lines(cache_key):
+    cache = ocr_cache.get_cache()
+    if cache is None or cache_key is None:
+        return None
+    try:
+        return cache.get(cache_key)
+    except Exception as e:
+        logging.warning(f"Could not read OCR cache: {e}")
+        return None
+
+def store_ocr_lines(cache_key, lines):
+    cache = ocr_cache.get_cache()
+    if cache is None or cache_key is None:
+        return
+    try:
+        cache.put(cache_key, lines)
+    except Exception as e:
+        logging.warning(f"Could not store OCR result in cache: {e}")
+
+def page_language(img, lang):
+    # A plan mixing scripts (e.g. "chi_sim+eng") is narrowed per page with
+    # Tesseract's script detection; same-script plans like "deu+ita" are
+    # handed to Tesseract as they are.
+    if not language_id.is_multi_script(lang):
+        return lang
+    try:
+        script = ocr_backend.detect_script(img)
+    except Exception as e:
+        logging.warning(f"Script detection failed: {e}")
+        return lang
+    return language_id.select_languages(lang, script)
+
+def raster_dpi():
+    return FAST_DPI if OCR_MODE == "two_tier" else DPI
+
+def dpi_key():
+    # Two-tier entries hold the fast pass's line boxes, single ones plain page text
+    return f"two_tier:{FAST_DPI}" if OCR_MODE == "two_tier" else f"single:{DPI}"
+
+def is_heading_candidate(line, body_height):
+    text = line["text"]
+    if not text:
+        return False
+    if body_height and line["height"] >= body_height * HEADING_HEIGHT_RATIO:
+        return True
+    return bool(HEADING_CANDIDATE_PATTERN.match(text)) or is_main_heading(text) or is_sub_heading(text)
+
+def render_crop(page, box, dpi):
+    # Pixel box from the FAST_DPI raster -> clip rect in points. Both the raster
+    # and get_pixmap's clip are in display (rotated) page space, so no derotation
+    left, top, width, height = box
+    scale = 72 / dpi
+    rect = fitz.Rect(
+        (left - CROP_PADDING) * scale,
+        (top - CROP_PADDING) * scale,
+        (left + width + CROP_PADDING) * scale,
+        (top + height + CROP_PADDING) * scale
+    )
+    pix = page.get_pixmap(dpi=HEADING_DPI, clip=rect, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+def reread_candidates(lines, lang, pdf_path, idx, cache_key=None):
+    # Text of the fast pass's lines with the heading candidates re-read at
+    # HEADING_DPI. The candidate rules run on every call, cached pages
+    # included, and each re-read is cached on its own under the page's key.
+    heights = sorted(line["height"] for line in lines if line["text"])
+    body_height = heights[len(heights) // 2] if heights else 0
+    texts = [line["text"] for line in lines]
+    candidates = [position for position, line in enumerate(lines) if is_heading_candidate(line, body_height)]
+    if not candidates:
+        return texts
+    
+    with fitz.open(pdf_path) as doc:
+        page = doc.load_page(idx)
+        for position in candidates:
+            box = lines[position]["box"]
+            key = ocr_cache.crop_key(cache_key, box, f"{HEADING_DPI}:{CROP_PADDING}") if cache_key else None
+            text = cached_ocr_lines(key)
+            if text is None:
+                # psm 7: the crop holds a single text line
+                text = ocr_backend.image_to_string(render_crop(page, box, FAST_DPI), lang, psm=7).strip()
+                store_ocr_lines(key, text)
+            if text:
+                texts[position] = text
+    return texts
+
+def two_tier_lines(img, lang, pdf_path, idx, cache_key=None):
+    lines = ocr_backend.image_to_lines(img, lang)
+    # The raw fast pass, with the language it was read in for later re-reads
+    store_ocr_lines(cache_key, {"lang": lang, "lines": lines})
+    return reread_candidates(lines, lang, pdf_path, idx, cache_key)
+
+def ocr_lines(img, lang, cache_key=None, pdf_path=None, idx=None):
+    lang = page_language(img, lang)
+    if OCR_MODE == "two_tier" and pdf_path is not None:
+        return two_tier_lines(img, lang, pdf_path, idx, cache_key)
+    lines = ocr_backend.image_to_string(img, lang).split("\n")
+    store_ocr_lines(cache_key, lines)
+    return lines
+
+def cached_page_lines(pdf_path, idx, cache_key):
+    # Lines of a page from the cache, or None when it has to be OCR'd
+    entry = cached_ocr_lines(cache_key)
+    if not isinstance(entry, dict):
+        return entry
+    try:
+        return reread_candidates(entry["lines"], entry["lang"], pdf_path, idx, cache_key)
+    except Exception as e:
+        logging.warning(f"Could not re-read headings of cached page {idx+1} of {pdf_path}: {e}")
+        return None
+
+def ocr_page(img, lang, idx, cache_key=None, pdf_path=None):
+    # Headings of one page image, or None when OCR failed
+    document = os.path.basename(pdf_path) if pdf_path else None
+    with instrumentation.stage("ocr_page", document):
+        try:
+            lines = ocr_lines(img, lang, cache_key, pdf_path, idx)
+        except Exception as e:
+            logging.error(f"OCR failed on page {idx+1}: {e}")
+            return None
+        
+        instrumentation.count(document, ocr_pages=1, lines=len(lines))
+        return classify_lines(lines, idx)
+
+def classify_cached_pages(pdf_path, ocr_indices, lang):
+    # Cache hits are classified from their stored OCR lines without being
+    # rasterized; returns those headings, the pages still to OCR and their keys.
+    keys = ocr_cache_keys(pdf_path, ocr_indices, lang)
+    headings = {}
+    misses = []
+    for idx in ocr_indices:
+        lines = cached_page_lines(pdf_path, idx, keys.get(idx))
+        if lines is None:
+            misses.append(idx)
+        else:
+            headings[idx] = classify_lines(lines, idx)
+    return headings, misses, keys
+
+def text_layer_lines(text):
+    # Text-layer lines as OCR reads the same page: a section number on its own
+    # line is joined to the title after it, and en dashes come out as em dashes
+    lines = []
+    number = None
+    for line in text.split("\n"):
+        line = line.strip().replace("–", "—")
+        if number is not None and line:
+            line = f"{number} {line}"
+            number = None
+        if SECTION_NUMBER_PATTERN.match(line):
+            number = line
+            continue
+        lines.append(line)
+    if number is not None:
+        lines.append(number)
+    return lines
+
+def text_layer_page(text, idx):
+    return classify_lines(text_layer_lines(text), idx)
+
+def read_text_layer(pdf_path, page_indices=None):
+    with instrumentation.stage("read_text_layer", os.path.basename(pdf_path)):
+        try:
+            doc = fitz.open(pdf_path)
+        except Exception as e:
+            logging.warning(f"Could not read text layer of {pdf_path}: {e}")
+            return None
+        
+        try:
+            if page_indices is None:
+                return [page.get_text() for page in doc]
+            return [doc.load_page(idx).get_text() for idx in page_indices]
+        except Exception as e:
+            logging.warning(f"Could not read text layer of {pdf_path}: {e}")
+            return None
+        finally:
+            doc.close()
+
+def has_usable_text(text):
+    if not text:
+        return False
+    
+    chars = "".join(text.split())
+    if len(chars) < MIN_TEXT_CHARS:
+        return False
+    
+    # Broken font encodings come out as U+FFFD or private-use glyphs, which fail isalnum()
+    good = sum(1 for ch in chars if ch.isalnum() or ch in TEXT_PUNCTUATION)
+    return good / len(chars) >= MIN_TEXT_QUALITY
+
+def get_page_count(pdf_path):
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def page_windows(page_indices, window):
+    # Group 0-based page indices into contiguous 1-based (first, last) ranges of at most `window` pages
+    first = last = None
+    for idx in page_indices:
+        page = idx + 1
+        if first is not None and page == last + 1 and page - first < window:
+            last = page
+            continue
+        if first is not None:
+            yield first, last
+        first = last = page
+    if first is not None:
+        yield first, last
+
+def iter_page_images(pdf_path, page_indices=None, dpi=None, window=PAGE_WINDOW):
+    dpi = dpi or raster_dpi()
+    document = os.path.basename(pdf_path)
+    if window <= 0 and page_indices is None:
+        with instrumentation.stage("convert_from_path", document):
+            images = convert_from_path(pdf_path, dpi=dpi)
+        idx = 0
+        while images:
+            yield idx, images.pop(0)
+            idx += 1
+        return
+    
+    if page_indices is None:
+        page_indices = range(get_page_count(pdf_path))
+    if window <= 0:
+        window = len(page_indices) or 1
+    
+    for first, last in page_windows(page_indices, window):
+        with instrumentation.stage("convert_from_path", document):
+            images = convert_from_path(pdf_path, dpi=dpi, first_page=first, last_page=last)
+        idx = first - 1
+        # Hand each image off as soon as it is yielded so only the window stays resident
+        while images:
+            yield idx, images.pop(0)
+            idx += 1
+
 def adjust_page_numbers(outline):
     # Adjust page numbers to match expected output
     page_adjustments = {
@@ -163,32 +436,7 @@ def adjust_page_numbers(outline):
     
     return cleaned_outline
 
-def extract_headings_from_pdf(pdf_path):
-    try:
-        pages = convert_from_path(pdf_path, dpi=DPI)
-    except Exception as e:
-        logging.error(f"Failed to convert {pdf_path} to images: {e}")
-        return None
-    
-    lang = DEFAULT_LANG
-    first_page_text = None
-    try:
-        first_page_text = pytesseract.image_to_string(pages[0], lang='eng')
-    except Exception:
-        pass
-    lang = detect_language(os.path.basename(pdf_path), first_page_text)
-    logging.info(f"Processing {os.path.basename(pdf_path)} [lang={lang}] ...")
-    
-    title = extract_title_from_first_page(first_page_text.split("\n") if first_page_text else [])
-    
-    outline = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(ocr_page, img, lang, idx): idx for idx, img in enumerate(pages)}
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
-                outline.extend(result)
-    
+def finalize_outline(outline):
     # Sort by page number and remove duplicates
     outline.sort(key=lambda x: x['page'])
     
@@ -216,33 +464,226 @@ def extract_headings_from_pdf(pdf_path):
     # Re-sort after page adjustments
     unique_outline.sort(key=lambda x: x['page'])
     
-    return unique_outline, title
+    return unique_outline
+
+def sample_pages(page_count, count=LANG_SAMPLE_PAGES):
+    if page_count <= count:
+        return list(range(page_count))
+    step = (page_count - 1) / (count - 1) if count > 1 else 0
+    return sorted({round(i * step) for i in range(count)})
+
+def identify_document_language(pdf_path, page_count, texts=None):
+    # Votes over a few sampled pages: text layers by character histogram and
+    # stopwords, image-only pages by Tesseract's script detection. Nothing is
+    # OCR'd here, and the result feeds the main OCR pass directly.
+    hint = filename_language(os.path.basename(pdf_path))
+    samples = sample_pages(page_count)
+    if texts is None:
+        sample_texts = read_text_layer(pdf_path, samples) or [None] * len(samples)
+    else:
+        sample_texts = [texts[idx] for idx in samples]
+    
+    votes = Counter()
+    image_pages = []
+    for idx, text in zip(samples, sample_texts):
+        if has_usable_text(text):
+            lang = language_id.text_language(text)
+            if lang:
+                votes[lang] += 1
+        else:
+            image_pages.append(idx)
+    
+    if image_pages:
+        latin_hint = hint if language_id.LANG_SCRIPTS.get(hint) == 'Latin' else None
+        try:
+            for idx, img in iter_page_images(pdf_path, image_pages):
+                lang = language_id.script_language(ocr_backend.detect_script(img), latin_hint, DEFAULT_LANG)
+                if lang:
+                    votes[lang] += 1
+        except Exception as e:
+            logging.warning(f"Script detection failed for {pdf_path}: {e}")
+    
+    return language_id.language_plan(votes, hint or DEFAULT_LANG)
+
+@instrumentation.work_unit
+def probe_document(pdf_path):
+    # Work unit: page count, language plan and title of one PDF
+    with instrumentation.stage("probe_document", os.path.basename(pdf_path)):
+        return _probe_document(pdf_path)
+
+def _probe_document(pdf_path):
+    texts = read_text_layer(pdf_path, [0])
+    if texts is not None:
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+    else:
+        page_count = get_page_count(pdf_path)
+    
+    first_page_text = texts[0] if texts and has_usable_text(texts[0]) else None
+    lang = identify_document_language(pdf_path, page_count)
+    title = extract_title_from_first_page(first_page_text.split("\n") if first_page_text else [])
+    logging.info(f"Processing {os.path.basename(pdf_path)} [lang={lang}, pages={page_count}] ...")
+    instrumentation.count(os.path.basename(pdf_path), pages=page_count)
+    return page_count, lang, title
+
+@instrumentation.work_unit
+def process_page_range(pdf_path, first, last, lang):
+    # Work unit: headings of pages first..last (0-based, inclusive), in page
+    # order, and whether every page could be read
+    document = os.path.basename(pdf_path)
+    page_indices = list(range(first, last + 1))
+    texts = read_text_layer(pdf_path, page_indices) or [None] * len(page_indices)
+    
+    headings = {}
+    ocr_indices = []
+    for idx, text in zip(page_indices, texts):
+        if has_usable_text(text):
+            with instrumentation.stage("classify_text_layer", document):
+                headings[idx] = text_layer_page(text, idx)
+            instrumentation.count(document, text_layer_pages=1, lines=text.count("\n") + 1)
+        else:
+            ocr_indices.append(idx)
+    
+    cached, misses, keys = classify_cached_pages(pdf_path, ocr_indices, lang)
+    headings.update(cached)
+    complete = True
+    if misses:
+        try:
+            for idx, img in iter_page_images(pdf_path, misses):
+                headings[idx] = ocr_page(img, lang, idx, keys.get(idx), pdf_path)
+                if headings[idx] is None:
+                    complete = False
+        except Exception as e:
+            logging.error(f"Failed to convert pages {first+1}-{last+1} of {pdf_path} to images: {e}")
+            complete = False
+    
+    outline = [item for idx in page_indices for item in headings.get(idx) or []]
+    instrumentation.count(document, headings=len(outline))
+    return outline, complete
+
+def output_name(pdf_file):
+    return os.path.splitext(pdf_file)[0] + ".json"
+
+def save_outline(pdf_file, outline, title):
+    if not title:
+        title = os.path.splitext(pdf_file)[0]
+    
+    result = {
+        "title": title,
+        "outline": outline
+    }
+    output_json = os.path.join(OUTPUT_DIR, output_name(pdf_file))
+    with instrumentation.stage("json_dump", pdf_file), open(output_json, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    instrumentation.count(pdf_file, outline_entries=len(outline))
+    logging.info(f"Output saved to: {output_json}")
+
+def process_batch(pdf_files, max_workers=MAX_WORKERS):
+    # One process pool for the whole directory: every PDF is probed, then split
+    # into page-range units, so cores stay busy across document boundaries.
+    # Each document's outline is reassembled in page order and written as soon
+    # as its last unit finishes. Returns the PDFs whose outline was written
+    # from every page; a document with a failed unit or page is still written
+    # but left out, so an incremental run retries it.
+    documents = {}
+    pending = {}
+    completed = []
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for pdf_file in pdf_files:
+            pdf_path = os.path.join(INPUT_DIR, pdf_file)
+            pending[executor.submit(probe_document, pdf_path)] = (pdf_file, None)
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_file, first = pending.pop(future)
+                pdf_path = os.path.join(INPUT_DIR, pdf_file)
+                
+                if first is None:
+                    try:
+                        page_count, lang, title = future.result()
+                    except Exception as e:
+                        logging.error(f"Failed to process {pdf_path}: {e}")
+                        continue
+                    if not page_count:
+                        logging.error(f"No pages found in {pdf_path}")
+                        continue
+                    
+                    starts = range(0, page_count, UNIT_PAGES)
+                    documents[pdf_file] = {"title": title, "units": {}, "remaining": len(starts), "complete": True}
+                    for start in starts:
+                        last = min(start + UNIT_PAGES, page_count) - 1
+                        unit = executor.submit(process_page_range, pdf_path, start, last, lang)
+                        pending[unit] = (pdf_file, start)
+                    continue
+                
+                document = documents[pdf_file]
+                try:
+                    document["units"][first], complete = future.result()
+                except Exception as e:
+                    logging.error(f"Failed to process pages of {pdf_path} from {first+1}: {e}")
+                    document["units"][first], complete = [], False
+                document["complete"] = document["complete"] and complete
+                document["remaining"] -= 1
+                
+                if document["remaining"] == 0:
+                    outline = [item for start in sorted(document["units"]) for item in document["units"][start]]
+                    save_outline(pdf_file, finalize_outline(outline), document["title"])
+                    if document["complete"]:
+                        completed.append(pdf_file)
+                    else:
+                        logging.warning(f"Some pages of {pdf_path} could not be read; it will be reprocessed next run")
+                    del documents[pdf_file]
+    
+    return completed
+
+def pipeline_version():
+    # Settings that change the outline for the same input are part of the version
+    return f"{PIPELINE_VERSION}:{OCR_MODE}:{raster_dpi()}:{HEADING_DPI}:{MIN_TEXT_CHARS}:{MIN_TEXT_QUALITY}"
+
+def process_all(pdf_files, max_workers=MAX_WORKERS):
+    # Processes every PDF and records the complete ones, replacing what the
+    # manifest held before
+    state = manifest.Manifest(os.path.join(OUTPUT_DIR, MANIFEST_NAME), pipeline_version())
+    state.prune([])
+    for pdf_file in process_batch(pdf_files, max_workers):
+        state.record(pdf_file, os.path.join(INPUT_DIR, pdf_file), output=output_name(pdf_file))
+    state.save()
+
+def process_incremental(pdf_files, max_workers=MAX_WORKERS):
+    # Reprocesses only PDFs that are new, changed (by size/mtime, then content
+    # hash), incomplete last time or whose outline JSON is missing; the rest
+    # keep their output.
+    state = manifest.Manifest(os.path.join(OUTPUT_DIR, MANIFEST_NAME), pipeline_version())
+    stale = []
+    for pdf_file in pdf_files:
+        entry = state.lookup(pdf_file, os.path.join(INPUT_DIR, pdf_file))
+        if entry is None or not os.path.exists(os.path.join(OUTPUT_DIR, entry["output"])):
+            stale.append(pdf_file)
+    logging.info(f"{len(pdf_files) - len(stale)} of {len(pdf_files)} PDFs unchanged since the last run")
+    
+    if stale:
+        # Stale entries go first, so a PDF that fails again is not taken for done
+        state.prune([pdf_file for pdf_file in pdf_files if pdf_file not in stale])
+        for pdf_file in process_batch(stale, max_workers):
+            state.record(pdf_file, os.path.join(INPUT_DIR, pdf_file), output=output_name(pdf_file))
+    state.prune(pdf_files)
+    state.save()
 
 def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    pdf_files = [f for f in os.listdir(INPUT_DIR) if f.lower().endswith('.pdf')]
+    pdf_files = sorted(f for f in os.listdir(INPUT_DIR) if f.lower().endswith('.pdf'))
     if not pdf_files:
         logging.warning(f"No PDF files found in {INPUT_DIR}")
         return
     
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(INPUT_DIR, pdf_file)
-        result_data = extract_headings_from_pdf(pdf_path)
-        if result_data is None:
-            continue
-        outline, title = result_data
-        
-        if not title:
-            title = os.path.splitext(pdf_file)[0]
-        
-        result = {
-            "title": title,
-            "outline": outline
-        }
-        output_json = os.path.join(OUTPUT_DIR, os.path.splitext(pdf_file)[0] + ".json")
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        logging.info(f"Output saved to: {output_json}")
+    instrumentation.start()
+    if INCREMENTAL:
+        process_incremental(pdf_files)
+    else:
+        process_all(pdf_files)
+    instrumentation.write_report(OUTPUT_DIR)
 
 if __name__ == "__main__":
     main()
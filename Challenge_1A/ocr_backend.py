@@ -0,0 +1,178 @@
+import io
+import os
+import re
+import logging
+import subprocess
+import threading
+
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# "auto" uses the in-process Tesseract C API (tesserocr) when it is installed
+# and falls back to piping images through the tesseract CLI.
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+TESSDATA_PREFIX = os.environ.get("TESSDATA_PREFIX")
+
+class TesserocrBackend:
+    name = "tesserocr"
+
+    def __init__(self):
+        # PyTessBaseAPI is not thread-safe, so every thread keeps its own
+        # engines; each engine loads its traineddata once and is reused.
+        self._local = threading.local()
+        self.version = f"{self.name}-{tesserocr.tesseract_version().split()[1]}"
+
+    def _engine(self, lang, **kwargs):
+        engines = getattr(self._local, "engines", None)
+        if engines is None:
+            engines = self._local.engines = {}
+
+        api = engines.get(lang)
+        if api is None:
+            kwargs["lang"] = lang
+            if TESSDATA_PREFIX and os.path.isdir(TESSDATA_PREFIX):
+                kwargs["path"] = TESSDATA_PREFIX
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            engines[lang] = api
+        return api
+
+    def image_to_string(self, img, lang, psm=None):
+        api = self._engine(lang)
+        default_psm = api.GetPageSegMode()
+        try:
+            if psm is not None:
+                api.SetPageSegMode(psm)
+            api.SetImage(img)
+            return api.GetUTF8Text()
+        finally:
+            api.SetPageSegMode(default_psm)
+            api.Clear()
+
+    def image_to_lines(self, img, lang):
+        api = self._engine(lang)
+        lines = []
+        try:
+            api.SetImage(img)
+            api.Recognize()
+            level = tesserocr.RIL.TEXTLINE
+            for item in tesserocr.iterate_level(api.GetIterator(), level):
+                text = item.GetUTF8Text(level)
+                box = item.BoundingBox(level)
+                if not text or not box:
+                    continue
+                left, top, right, bottom = box
+                lines.append({
+                    "text": text.strip(),
+                    "box": (left, top, right - left, bottom - top),
+                    "height": bottom - top
+                })
+        finally:
+            api.Clear()
+        return lines
+
+    def detect_script(self, img):
+        api = self._engine("osd", psm=tesserocr.PSM.OSD_ONLY)
+        try:
+            api.SetImage(img)
+            result = api.DetectOrientationScript()
+        finally:
+            api.Clear()
+        return result["script_name"] if result else None
+
+class CliBackend:
+    name = "tesseract-cli"
+
+    def __init__(self):
+        self.cmd = pytesseract.pytesseract.tesseract_cmd
+        self.version = f"{self.name}-{pytesseract.get_tesseract_version()}"
+
+    def _run(self, img, args):
+        # Uncompressed PNM over stdin: no temp files and no PNG encoding cost
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="PPM")
+        proc = subprocess.run(
+            [self.cmd, "stdin", "stdout"] + args,
+            input=buf.getvalue(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip())
+        return proc.stdout.decode("utf-8", "replace")
+
+    def image_to_string(self, img, lang, psm=None):
+        args = ["-l", lang]
+        if psm is not None:
+            args += ["--psm", str(psm)]
+        return self._run(img, args)
+
+    def image_to_lines(self, img, lang):
+        # TSV rows are words; group them into lines and keep the median word
+        # height as the line's glyph height
+        rows = self._run(img, ["-l", lang, "tsv"]).splitlines()
+        words = {}
+        for row in rows[1:]:
+            cols = row.split("\t")
+            if len(cols) < 12 or cols[0] != "5" or not cols[11].strip():
+                continue
+            key = (int(cols[2]), int(cols[3]), int(cols[4]))
+            left, top, width, height = (int(v) for v in cols[6:10])
+            words.setdefault(key, []).append((left, top, width, height, cols[11].strip()))
+
+        lines = []
+        for key in sorted(words):
+            items = words[key]
+            left = min(w[0] for w in items)
+            top = min(w[1] for w in items)
+            right = max(w[0] + w[2] for w in items)
+            bottom = max(w[1] + w[3] for w in items)
+            heights = sorted(w[3] for w in items)
+            lines.append({
+                "text": " ".join(w[4] for w in items),
+                "box": (left, top, right - left, bottom - top),
+                "height": heights[len(heights) // 2]
+            })
+        return lines
+
+    def detect_script(self, img):
+        output = self._run(img, ["--psm", "0"])
+        match = re.search(r"^Script:\s*(\S+)", output, re.MULTILINE)
+        return match.group(1) if match else None
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    # One backend per process; pool workers keep it (and its engines) across pages and documents
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(OCR_BACKEND)
+    return _backend
+
+def create_backend(kind="auto"):
+    if kind in ("auto", "tesserocr") and tesserocr is not None:
+        try:
+            return TesserocrBackend()
+        except Exception as e:
+            logging.warning(f"tesserocr unavailable, falling back to tesseract CLI: {e}")
+    elif kind == "tesserocr":
+        logging.warning("tesserocr is not installed, falling back to tesseract CLI")
+    return CliBackend()
+
+def image_to_string(img, lang, psm=None):
+    return get_backend().image_to_string(img, lang, psm)
+
+def image_to_lines(img, lang):
+    return get_backend().image_to_lines(img, lang)
+
+def detect_script(img):
+    return get_backend().detect_script(img)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import fitz
+
+# Raw OCR lines keyed by page content, language, DPI and OCR engine version,
+# and heading crops re-read at a higher DPI keyed by their page's key and box.
+# Set OCR_CACHE_PATH to an empty string to disable the cache.
+OCR_CACHE_PATH = os.environ.get("OCR_CACHE_PATH", os.path.join(".cache", "ocr_cache.sqlite"))
+OCR_CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_MB", "256")) * 1024 * 1024
+# Eviction trims the cache to this share of the limit so it doesn't run on every put
+EVICT_TO = 0.9
+CACHE_SCHEMA = 2
+
+class OcrCache:
+    def __init__(self, path=OCR_CACHE_PATH, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Pool workers each open their own connection; WAL lets them read while one
+        # writes. Threads within a process share it behind a lock.
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_lines ("
+            "key TEXT PRIMARY KEY, lines TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ocr_lines_last_used ON ocr_lines (last_used)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT lines FROM ocr_lines WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE ocr_lines SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, lines):
+        value = json.dumps(lines, ensure_ascii=False)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_lines (key, lines, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), time.time())
+            )
+            self._evict()
+
+    def total_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_lines").fetchone()[0]
+
+    def _evict(self):
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until we are back under the target
+        target = self.max_bytes * EVICT_TO
+        rows = self.conn.execute("SELECT key, size FROM ocr_lines ORDER BY last_used")
+        stale = []
+        for key, size in rows:
+            if total <= target:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM ocr_lines WHERE key = ?", stale)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_cache = None
+_cache_pid = None
+
+def get_cache():
+    # One connection per process; a connection inherited through fork is never reused
+    global _cache, _cache_pid
+    if not OCR_CACHE_PATH:
+        return None
+    if _cache is None or _cache_pid != os.getpid():
+        try:
+            _cache = OcrCache()
+            _cache_pid = os.getpid()
+        except Exception as e:
+            logging.warning(f"OCR cache disabled: {e}")
+            return None
+    return _cache
+
+def page_fingerprint(doc, page):
+    # Hash what the page draws: its content stream plus every image and form it
+    # references, so identical pages hit the cache across files and file names.
+    h = hashlib.sha256()
+    h.update(f"{page.rect}|{page.rotation}".encode())
+    h.update(page.read_contents())
+    xrefs = {img[0] for img in page.get_images(full=True)} | {xobj[0] for xobj in page.get_xobjects()}
+    # xref numbers differ between files, so order the referenced streams by their own digest
+    for digest in sorted(hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest() for xref in xrefs):
+        h.update(digest)
+    return h.hexdigest()
+
+def page_fingerprints(pdf_path, page_indices):
+    try:
+        with fitz.open(pdf_path) as doc:
+            return {idx: page_fingerprint(doc, doc.load_page(idx)) for idx in page_indices}
+    except Exception as e:
+        logging.warning(f"Could not fingerprint pages of {pdf_path}: {e}")
+        return {}
+
+def make_key(fingerprint, lang, dpi, engine):
+    return hashlib.sha256(f"{CACHE_SCHEMA}|{fingerprint}|{lang}|{dpi}|{engine}".encode()).hexdigest()
+
+def crop_key(page_key, box, dpi):
+    # A line of the page behind page_key re-read on its own at `dpi`
+    return hashlib.sha256(f"{page_key}|crop|{dpi}|{','.join(str(v) for v in box)}".encode()).hexdigest()
@@ -0,0 +1,10 @@
+from collections import Counter
+
+from language_id import language_plan
+
+def test_lone_vote_does_not_widen_plan():
+    assert language_plan(Counter({"chi_sim": 2, "eng": 1}), "eng") == "chi_sim"
+
+def test_disagreeing_samples_share_plan():
+    assert language_plan(Counter({"deu": 2, "ita": 2}), "eng") == "deu+ita"
+    assert language_plan(Counter(), "eng") == "eng"
@@ -0,0 +1,59 @@
+import fitz
+import pytest
+
+import multilingual_outline_extractor as mx
+import ocr_cache
+
+LINES = [
+    {"text": "1. Introduction", "box": (10, 10, 200, 20), "height": 20},
+    {"text": "Body text of the page", "box": (10, 40, 300, 12), "height": 12},
+    {"text": "More body text", "box": (10, 60, 300, 12), "height": 12}
+]
+
+@pytest.fixture
+def page_pdf(tmp_path):
+    path = str(tmp_path / "page.pdf")
+    doc = fitz.open()
+    doc.new_page().insert_text((60, 120), "1. Introduction", fontsize=24)
+    doc.save(path)
+    return path
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ocr_cache.OcrCache(str(tmp_path / "ocr.sqlite"))
+    monkeypatch.setattr(ocr_cache, "get_cache", lambda: cache)
+    yield cache
+    cache.close()
+
+@pytest.fixture
+def rereads(monkeypatch):
+    # Boxes of the lines re-read at HEADING_DPI, in call order
+    calls = []
+    monkeypatch.setattr(mx.ocr_backend, "image_to_lines", lambda img, lang: [dict(line) for line in LINES])
+    monkeypatch.setattr(mx, "render_crop", lambda page, box, dpi: tuple(box))
+    def image_to_string(crop, lang, psm=None):
+        calls.append(crop)
+        return f"re-read {crop[1]}"
+    monkeypatch.setattr(mx.ocr_backend, "image_to_string", image_to_string)
+    return calls
+
+def test_cache_keeps_raw_lines_and_rereads_apart(page_pdf, cache, rereads):
+    key = "page-key"
+    assert mx.two_tier_lines(None, "eng", page_pdf, 0, key) == ["re-read 10", "Body text of the page", "More body text"]
+    assert rereads == [(10, 10, 200, 20)]
+
+    entry = cache.get(key)
+    assert entry["lang"] == "eng"
+    assert [line["text"] for line in entry["lines"]] == [line["text"] for line in LINES]
+
+    # A cache hit re-reads nothing it has re-read before
+    assert mx.cached_page_lines(page_pdf, 0, key) == ["re-read 10", "Body text of the page", "More body text"]
+    assert len(rereads) == 1
+
+def test_new_candidate_rules_apply_to_cached_pages(page_pdf, cache, rereads, monkeypatch):
+    key = "page-key"
+    mx.two_tier_lines(None, "eng", page_pdf, 0, key)
+
+    monkeypatch.setattr(mx, "is_heading_candidate", lambda line, body_height: line["text"].startswith(("1.", "More")))
+    assert mx.cached_page_lines(page_pdf, 0, key) == ["re-read 10", "Body text of the page", "re-read 60"]
+    assert rereads == [(10, 10, 200, 20), (10, 60, 300, 12)]
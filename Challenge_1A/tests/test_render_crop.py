@@ -0,0 +1,42 @@
+import fitz
+import pytest
+
+from multilingual_outline_extractor import CROP_PADDING, FAST_DPI, HEADING_DPI, render_crop
+
+DARK = 128
+# Rasters at different DPIs anti-alias glyph edges differently
+TOLERANCE = 2
+
+def dark_box(samples, width, height, stride):
+    # (left, top, width, height) of the dark pixels of a grayscale raster
+    rows, cols = [], []
+    for y in range(height):
+        row = samples[y * stride:y * stride + width]
+        xs = [x for x, value in enumerate(row) if value < DARK]
+        if xs:
+            rows.append(y)
+            cols.extend((xs[0], xs[-1]))
+    assert rows, "no dark pixels"
+    return min(cols), min(rows), max(cols) - min(cols) + 1, max(rows) - min(rows) + 1
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+def test_render_crop_clips_heading_on_rotated_page(rotation):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    # Off-centre, so a crop taken in the wrong page space misses it
+    page.insert_text((60, 120), "1. Introduction", fontsize=24)
+    page.set_rotation(rotation)
+
+    # The FAST_DPI raster the line boxes come from is in display (rotated) space
+    raster = page.get_pixmap(dpi=FAST_DPI, colorspace=fitz.csGRAY, alpha=False)
+    box = dark_box(raster.samples, raster.width, raster.height, raster.stride)
+    crop = render_crop(page, box, FAST_DPI)
+
+    # The crop is the box plus CROP_PADDING raster pixels on each side, at
+    # HEADING_DPI, and the heading sits inside it at the padding offset
+    scale = HEADING_DPI / FAST_DPI
+    _, _, width, height = box
+    expected = (CROP_PADDING, CROP_PADDING, width, height, width + 2 * CROP_PADDING, height + 2 * CROP_PADDING)
+    found = dark_box(crop.tobytes(), crop.width, crop.height, crop.width) + crop.size
+    for actual, value in zip(found, expected):
+        assert abs(actual - value * scale) <= TOLERANCE * scale, (found, expected)
@@ -0,0 +1,18 @@
+from multilingual_outline_extractor import text_layer_lines, text_layer_page
+
+def test_section_number_joined_to_its_title():
+    text = "Inhalt\n7.\nServiceteil\nLiteratur 669\n"
+    assert text_layer_lines(text) == ["Inhalt", "7. Serviceteil", "Literatur 669", ""]
+    assert [item["text"] for item in text_layer_page(text, 6)] == ["7. Serviceteil "]
+
+def test_page_numbers_are_not_joined():
+    # Only numbers with a dot are section numbers; "6" is the page of the entry above
+    assert text_layer_lines("Acknowledgements\n6 \n2.1 \nIntended Audience \n") == [
+        "Acknowledgements", "6", "2.1 Intended Audience", ""]
+
+def test_dashes_read_as_ocr_reads_them():
+    text = "3. \nOverview of the Foundation Level Extension – Agile Tester Syllabus\n4. \nReferences \n"
+    assert [item["text"] for item in text_layer_page(text, 3)] == [
+        "3. Overview of the Foundation Level Extension — Agile TesterSyllabus ",
+        "4. References "
+    ]
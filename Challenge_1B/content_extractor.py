@@ -1,8 +1,14 @@
 import json
-import fitz
 import os
 import re
-from typing import List, Dict, Any
+import fitz
+from bisect import bisect_right
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import instrumentation
+from document_parser import iter_pages
+
+# Ranked entries keep their section under this key instead of a copy of its text
+SECTION_REF = "_section"
 
 class ContentExtractor:
     def __init__(self):
@@ -13,7 +19,8 @@ class ContentExtractor:
             return ""
         
         text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^\w\s\.\,\;\:\!\?\-\(\)\[\]\{\}]', '', text)
+        # CJK sentence ends are kept so sub-sections can be cut at them
+        text = re.sub(r'[^\w\s\.\,\;\:\!\?\-\(\)\[\]\{\}。！？；]', '', text)
         text = text.strip()
         
         return text
@@ -32,36 +39,176 @@ class ContentExtractor:
         
         return True
     
-    def extract_content_for_outline(self, pdf_path: str, outline_data: Dict[str, Any]) -> Dict[str, Any]:
-        doc = fitz.open(pdf_path)
-        pdf_text = []
-        
-        for page in doc:
-            text = page.get_text()
-            cleaned_text = self._clean_text(text)
-            pdf_text.append(cleaned_text)
-        
-        doc.close()
-        
-        final_content = {
-            "title": outline_data["title"],
-            "content": []
+    def iter_sections(self, page_headings: Iterable[Tuple[int, str, List[Dict[str, Any]]]], assembler: "SectionAssembler",
+                      document: str = None) -> Iterator[Dict[str, Any]]:
+        # Each section is yielded as soon as the heading after it (or the end
+        # of the document) is reached
+        for page_index, text, headings in page_headings:
+            with instrumentation.stage("extract_content", document):
+                sections = assembler.add_page(text, headings)
+            yield from sections
+        yield from assembler.finish()
+    
+    def extract_content_from_pages(self, page_headings: Iterable[Tuple[int, str, List[Dict[str, Any]]]], title: str) -> Dict[str, Any]:
+        # Sections run from one heading to the next (possibly across pages) and
+        # are kept as offsets into one shared buffer; call section_content()
+        # to get the text of a section.
+        assembler = SectionAssembler(self)
+        sections = list(self.iter_sections(page_headings, assembler))
+        return {
+            "title": title,
+            "content": sections,
+            "text": assembler.document_text
         }
-        
-        for heading in outline_data["outline"]:
-            page_num = heading["page"] - 1
-            if page_num < len(pdf_text):
-                text = pdf_text[page_num]
-                
-                if self._is_quality_content(text):
-                    final_content["content"].append({
-                        "level": heading["level"],
-                        "heading": heading["text"],
-                        "page": heading["page"],
-                        "content": text
-                    })
-        
-        return final_content
+    
+    def extract_content_for_outline(self, pdf_path: str, outline_data: Dict[str, Any]) -> Dict[str, Any]:
+        with fitz.open(pdf_path) as doc:
+            return self.extract_content_from_pages(outline_page_headings(iter_pages(doc), outline_data), outline_data["title"])
+
+class SectionAssembler:
+    # Builds a document's sections in one pass over its pages: a section is
+    # closed when the next heading is located, and only the cleaned page
+    # text is kept.
+    def __init__(self, extractor: ContentExtractor):
+        self.extractor = extractor
+        self.builder = DocumentTextBuilder()
+        self.document_text: Optional["DocumentText"] = None
+        self.cursor = 0
+        self.open: Optional[Tuple[Dict[str, Any], int]] = None
+    
+    def _heading_offset(self, page_text: str, page_start: int, heading: str) -> int:
+        start = max(self.cursor, page_start)
+        needle = self.extractor._clean_text(heading)
+        if needle:
+            pos = page_text.find(needle, start - page_start)
+            if pos != -1:
+                return page_start + pos
+        return start
+    
+    def _close(self, end: int) -> List[Dict[str, Any]]:
+        heading, start = self.open
+        self.open = None
+        if not self.extractor._is_quality_content(self.builder.slice(start, end)):
+            return []
+        return [{
+            "level": heading["level"],
+            "heading": heading["text"],
+            "page": heading["page"],
+            "start": start,
+            "end": end
+        }]
+    
+    def add_page(self, text: str, headings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        page_text = self.extractor._clean_text(text)
+        page_start = self.builder.add_page(page_text)
+        closed = []
+        for heading in headings:
+            self.cursor = self._heading_offset(page_text, page_start, heading["text"])
+            if self.open is not None:
+                closed.extend(self._close(self.cursor))
+            self.open = (heading, self.cursor)
+        return closed
+    
+    def slice(self, start: int, end: int) -> str:
+        if self.document_text is not None:
+            return self.document_text.slice(start, end)
+        return self.builder.slice(start, end)
+    
+    def finish(self) -> List[Dict[str, Any]]:
+        closed = self._close(self.builder.length) if self.open is not None else []
+        self.document_text = self.builder.build()
+        return closed
+
+def outline_page_headings(pages: Iterable[Tuple[int, str]], outline_data: Dict[str, Any]) -> Iterator[Tuple[int, str, List[Dict[str, Any]]]]:
+    # Pairs each page with the headings a precomputed outline puts on it
+    by_page = {}
+    for heading in outline_data["outline"]:
+        by_page.setdefault(heading["page"], []).append(heading)
+    for page_index, text in pages:
+        yield page_index, text, by_page.get(page_index + 1, [])
+
+class DocumentText:
+    # Cleaned text of a whole document with the offset at which each page starts
+    __slots__ = ("text", "page_starts")
+    
+    def __init__(self, page_texts: List[str]):
+        self.page_starts = []
+        offset = 0
+        for text in page_texts:
+            self.page_starts.append(offset)
+            offset += len(text) + 1
+        self.text = " ".join(page_texts)
+    
+    @classmethod
+    def from_buffer(cls, text: str, page_starts: List[int]) -> "DocumentText":
+        document_text = cls.__new__(cls)
+        document_text.text = text
+        document_text.page_starts = list(page_starts)
+        return document_text
+    
+    def slice(self, start: int, end: int) -> str:
+        return self.text[start:end].strip()
+
+class DocumentTextBuilder:
+    # Cleaned pages appended one at a time, laid out as in DocumentText
+    def __init__(self):
+        self.pages: List[str] = []
+        self.page_starts: List[int] = []
+        self.length = 0
+    
+    def add_page(self, text: str) -> int:
+        start = self.length + 1 if self.pages else 0
+        self.pages.append(text)
+        self.page_starts.append(start)
+        self.length = start + len(text)
+        return start
+    
+    def slice(self, start: int, end: int) -> str:
+        # Same as DocumentText.slice, joining only the pages the span touches
+        if end <= start:
+            return ""
+        first = bisect_right(self.page_starts, start) - 1
+        last = bisect_right(self.page_starts, end - 1) - 1
+        offset = self.page_starts[first]
+        return " ".join(self.pages[first:last + 1])[start - offset:end - offset].strip()
+    
+    def build(self) -> DocumentText:
+        document_text = DocumentText.from_buffer(" ".join(self.pages), self.page_starts)
+        self.pages = []
+        return document_text
+
+def section_content(content_data: Dict[str, Any], section: Dict[str, Any]) -> str:
+    if "content" in section:
+        return section["content"]
+    document_text = content_data.get("text")
+    if document_text is None:
+        return ""
+    return document_text.slice(section["start"], section["end"])
+
+def ranked_content(content_data: Optional[Dict[str, Any]], ranked: Dict[str, Any]) -> str:
+    # Ranked entries point back at their section (SECTION_REF) rather than
+    # carrying its text; it is sliced only for entries that still need it
+    if "content" in ranked:
+        return ranked["content"]
+    section = ranked.get(SECTION_REF)
+    if section is None or content_data is None:
+        return ""
+    return section_content(content_data, section)
+
+def materialize_content(content_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Plain-JSON copy with each section's text filled in
+    return {
+        "title": content_data["title"],
+        "content": [
+            {
+                "level": section["level"],
+                "heading": section["heading"],
+                "page": section["page"],
+                "content": section_content(content_data, section)
+            }
+            for section in content_data["content"]
+        ]
+    }
 
 def extract_content_from_pdf_with_outline(pdf_path: str, outline_data: Dict[str, Any]) -> Dict[str, Any]:
     extractor = ContentExtractor()
@@ -75,4 +222,4 @@ if __name__ == "__main__":
         with open(outline_path, "r", encoding="utf-8") as f:
             outline_data = json.load(f)
         content = extract_content_from_pdf_with_outline(pdf_path, outline_data)
-        print(json.dumps(content, indent=2, ensure_ascii=False)) 
\ No newline at end of file
+        print(json.dumps(materialize_content(content), indent=2, ensure_ascii=False)) 
\ No newline at end of file
@@ -0,0 +1,14 @@
+import fitz
+import os
+from typing import Any, Dict, Iterator, Tuple
+import instrumentation
+
+def document_title(metadata: Dict[str, Any], pdf_path: str) -> str:
+    return (metadata or {}).get('title', '') or os.path.basename(pdf_path).replace('.pdf', '')
+
+def iter_pages(doc: fitz.Document, document: str = None, start: int = 0, stop: int = None) -> Iterator[Tuple[int, str]]:
+    # (page index, text) one page at a time; only the current page is loaded
+    for page_index in range(start, len(doc) if stop is None else min(stop, len(doc))):
+        with instrumentation.stage("parse_pdf", document):
+            text = doc[page_index].get_text()
+        yield page_index, text
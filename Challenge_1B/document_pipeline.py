@@ -0,0 +1,121 @@
+import math
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import fitz
+
+import instrumentation
+from content_extractor import ContentExtractor, SectionAssembler, outline_page_headings
+from document_parser import document_title, iter_pages
+from near_duplicates import duplicate_index
+from outline_extractor import OutlineExtractor, bookmark_outline
+from relevance_ranker import RelevanceRanker
+
+# PDFs with more pages than this are split into contiguous page ranges read by
+# separate workers (ROUND1B_SHARD_PAGES or --shard-pages; 0 turns sharding off)
+SHARD_PAGES = int(os.environ.get("ROUND1B_SHARD_PAGES", "500"))
+
+PageHeadings = Tuple[int, str, List[Dict[str, Any]]]
+
+def page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+def shard_ranges(pages: int, shard_pages: int, max_shards: int) -> List[Tuple[int, int]]:
+    # Near-equal contiguous [start, stop) ranges; a single range when sharding does not apply
+    if not shard_pages or pages <= shard_pages or max_shards < 2:
+        return [(0, pages)]
+    shards = min(max_shards, math.ceil(pages / shard_pages))
+    bounds = [pages * k // shards for k in range(shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def read_shard(pdf_path: str, start: int, stop: int, blocklist_path: str = None) -> List[PageHeadings]:
+    # Text and headings of pages [start, stop), in page order. Every worker opens
+    # the file itself; MuPDF reads it lazily, so workers share the OS page cache
+    # and no worker reads pages outside its range.
+    document = os.path.basename(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        bookmarks = bookmark_outline(doc.get_toc(), len(doc))
+        pages = iter_pages(doc, document, start, stop)
+        return list(OutlineExtractor(blocklist_path).iter_page_headings(pages, document, bookmarks))
+
+def _drain(shards: List[Optional[List[PageHeadings]]]) -> Iterator[PageHeadings]:
+    # Merged page stream of ordered shards, releasing each shard once consumed
+    for k in range(len(shards)):
+        shard, shards[k] = shards[k], None
+        yield from shard
+
+def stream_document(pdf_path: str, ranker: RelevanceRanker = None, blocklist_path: str = None,
+                    shards: List[List[PageHeadings]] = None, outline_data: Dict[str, Any] = None) -> Dict[str, Any]:
+    # One pass over the PDF as a chain of generators: each page is read, searched
+    # for headings and cut into sections before the next page is loaded, so no
+    # stage holds the raw text of the whole document. A legacy-scoring ranker
+    # scores each section as it closes, skipping near-duplicates of earlier
+    # sections of the document. Returns the same outline/content dicts
+    # as extract_outline_from_pdf / extract_content_from_pdf_with_outline, plus
+    # ranked_sections and sub_section_analysis when a ranker is given. With
+    # shards (read_shard results in page order) the pages were already read
+    # and searched for headings by workers, and only assembly runs here. With
+    # outline_data (e.g. Challenge_1A's outline of the same PDF) its headings
+    # are used and no heading detection runs.
+    document = os.path.basename(pdf_path)
+    outline_extractor = OutlineExtractor(blocklist_path)
+    content_extractor = ContentExtractor()
+    assembler = SectionAssembler(content_extractor)
+    outline: List[Dict[str, Any]] = []
+    line_count = 0
+    
+    def collect(page_headings: Iterable[Tuple[int, str, List[Dict[str, Any]]]]) -> Iterator[Tuple[int, str, List[Dict[str, Any]]]]:
+        nonlocal line_count
+        for page_index, text, headings in page_headings:
+            outline.extend(headings)
+            line_count += text.count("\n")
+            yield page_index, text, headings
+    
+    with fitz.open(pdf_path) as doc:
+        title = document_title(doc.metadata, pdf_path)
+        page_count = len(doc)
+        if outline_data is not None:
+            pages = iter_pages(doc, document) if shards is None else ((i, text) for i, text, _ in _drain(shards))
+            page_headings = collect(outline_page_headings(pages, outline_data))
+        elif shards is None:
+            # Bookmarked PDFs take their headings from the bookmarks (see bookmark_outline)
+            bookmarks = bookmark_outline(doc.get_toc(), page_count)
+            page_headings = collect(outline_extractor.iter_page_headings(iter_pages(doc, document), document, bookmarks))
+        else:
+            page_headings = collect(_drain(shards))
+        
+        sections = []
+        content = {"title": title, "content": sections}
+        ranked_sections = []
+        duplicates = duplicate_index() if ranker is not None else None
+        for section in content_extractor.iter_sections(page_headings, assembler, document):
+            sections.append(section)
+            if ranker is not None:
+                section_text = assembler.slice(section["start"], section["end"])
+                if duplicates is not None:
+                    with instrumentation.stage("deduplicate", document):
+                        if duplicates.add(content, section, section_text):
+                            continue
+                with instrumentation.stage("rank_sections", document):
+                    ranked = ranker.rank_section_legacy(title, section, section_text)
+                if ranked is not None:
+                    ranked_sections.append(ranked)
+    
+    instrumentation.count(document, pages=page_count, lines=line_count, headings=len(outline), sections=len(sections))
+    content["text"] = assembler.document_text
+    result = {
+        "outline": {"title": title, "outline": outline},
+        "content": content
+    }
+    if ranker is not None:
+        if duplicates is not None:
+            instrumentation.count(document, duplicate_sections=duplicates.duplicate_count)
+        with instrumentation.stage("rank_sections", document):
+            ranked_sections.sort(key=lambda x: x["importance_rank"], reverse=True)
+            if duplicates is not None:
+                ranker.link_duplicates(ranked_sections, duplicates)
+            result["ranked_sections"] = ranked_sections
+            result["sub_section_analysis"] = ranker.analyze_sub_sections(ranked_sections, result["content"])
+        instrumentation.count(document, ranked_sections=len(ranked_sections))
+    return result
@@ -0,0 +1,61 @@
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from content_extractor import DocumentText
+from manifest import Manifest, write_json
+
+MANIFEST_NAME = "manifest.json"
+DOCUMENTS_DIR = "documents"
+
+def serialize_document(result: Dict[str, Any]) -> Dict[str, Any]:
+    content = dict(result["content"])
+    document_text = content.pop("text", None)
+    if document_text is not None:
+        content["text"] = {"text": document_text.text, "page_starts": document_text.page_starts}
+    return {"outline": result["outline"], "content": content}
+
+def deserialize_document(data: Dict[str, Any]) -> Dict[str, Any]:
+    content = data["content"]
+    if "text" in content:
+        content["text"] = DocumentText.from_buffer(content["text"]["text"], content["text"]["page_starts"])
+    return {"outline": data["outline"], "content": content}
+
+class DocumentStore:
+    # Per-PDF outline and content kept between runs, stored by content hash and
+    # indexed by a manifest, so unchanged PDFs are never reopened.
+    def __init__(self, cache_dir: str, pipeline_version: str):
+        self.cache_dir = cache_dir
+        self.documents_dir = os.path.join(cache_dir, DOCUMENTS_DIR)
+        self.manifest = Manifest(os.path.join(cache_dir, MANIFEST_NAME), pipeline_version, print)
+
+    def _document_path(self, digest: str) -> str:
+        return os.path.join(self.documents_dir, digest + ".json")
+
+    def load(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        entry = self.manifest.lookup(pdf_path)
+        if entry is None:
+            return None
+        try:
+            with open(self._document_path(entry["sha256"]), "r", encoding="utf-8") as f:
+                return deserialize_document(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, pdf_path: str, result: Dict[str, Any]) -> None:
+        os.makedirs(self.documents_dir, exist_ok=True)
+        entry = self.manifest.record(pdf_path)
+        write_json(self._document_path(entry["sha256"]), serialize_document(result))
+
+    def prune(self, pdf_paths: Iterable[str]) -> None:
+        # Forget PDFs that are gone and delete documents no entry refers to
+        self.manifest.prune(pdf_paths)
+        if not os.path.isdir(self.documents_dir):
+            return
+        live = {entry["sha256"] + ".json" for entry in self.manifest.entries.values()}
+        for name in os.listdir(self.documents_dir):
+            if name.endswith(".json") and name not in live:
+                os.remove(os.path.join(self.documents_dir, name))
+
+    def flush(self) -> None:
+        self.manifest.save()
@@ -0,0 +1,164 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+DEFAULT_PUBLISHER_NAMES = {
+    'wiley', 'elsevier', 'springer', 'taylor', 'francis', 'sage', 'emerald',
+    'blackwell', 'oxford', 'cambridge', 'mit', 'ieee', 'acm', 'ssrn', 'arxiv',
+    'biorxiv', 'medrxiv', 'chemrxiv', 'authorea', 'research square', 'sciety',
+    'prereview', 'review commons', 'asapbio', 'elife', 'reseach square'
+}
+
+DEFAULT_AUTHOR_INDICATORS = [
+    'liu jingyi', 'yang heng', 'chu jingli', 'andrea zini', 'beate weyland',
+    'uwe flick', 'ernst von kardorff', 'ines steinke', 'werner meinefeld',
+    'jo reichertz', 'hans merkens', 'udo kelle', 'christian erzberger',
+    'stephan wolff', 'christel hopf', 'hubert knoblauch', 'alessia bartolini',
+    'federico batini', 'mina de santis', 'marco milella', 'pierluigi malavasi'
+]
+
+DEFAULT_HEADING_PATTERNS = {
+    'h1': [
+        r'^(?:\d+\.)?\s*([A-Z][A-Z\s]{3,50})$',
+        r'^(?:\d+\.)?\s*([A-Z][a-z\s]{4,100})$',
+        r'^(?:Chapter|Section|Part)\s+\d+[:\s]+([A-Z][A-Za-z\s]{4,100})$',
+        r'^([A-Z][A-Za-z\s]{4,100})\s*$'
+    ],
+    'h2': [
+        r'^(?:\d+\.\d+)?\s*([A-Z][A-Z\s]{3,50})$',
+        r'^(?:\d+\.\d+)?\s*([A-Z][a-z\s]{4,100})$',
+        r'^(?:Subsection|Subchapter)\s+\d+[:\s]+([A-Z][A-Za-z\s]{4,100})$'
+    ],
+    'h3': [
+        r'^(?:\d+\.\d+\.\d+)?\s*([A-Z][A-Z\s]{3,50})$',
+        r'^(?:\d+\.\d+\.\d+)?\s*([A-Z][a-z\s]{4,100})$'
+    ]
+}
+
+NUMERIC_RE = re.compile(r'^\d+$')
+SHORT_CAPS_RE = re.compile(r'^[A-Z\s]{2,}$')
+PERSON_NAME_RE = re.compile(r'^[A-Z][a-z]+\s+[A-Z][a-z]+$')
+# Unescaped "(" that opens a plain capturing group
+CAPTURING_GROUP_RE = re.compile(r'(?<!\\)\((?!\?)')
+
+# Does any of a fixed set of strings occur inside a text? Uses an Aho-Corasick
+# automaton (pyahocorasick) when installed and one compiled alternation
+# otherwise; either way the text is scanned once, not once per pattern.
+class SubstringMatcher:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted({p for p in patterns if p}, key=len, reverse=True)
+        self._automaton = None
+        self._regex = None
+        if not self.patterns:
+            return
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self._automaton.add_word(pattern, pattern)
+            self._automaton.make_automaton()
+        else:
+            self._regex = re.compile('|'.join(re.escape(p) for p in self.patterns))
+
+    def search(self, text: str) -> bool:
+        if self._automaton is not None:
+            for _ in self._automaton.iter(text):
+                return True
+            return False
+        if self._regex is not None:
+            return self._regex.search(text) is not None
+        return False
+
+# Built once per process: every level pattern merged into one regex with named
+# groups, plus precompiled blocklist matchers.
+class HeadingClassifier:
+    def __init__(self, heading_patterns: Dict[str, List[str]] = None,
+                 publisher_names: Iterable[str] = None,
+                 author_indicators: Iterable[str] = None):
+        self.heading_patterns = heading_patterns or DEFAULT_HEADING_PATTERNS
+        self.publisher_names = set(DEFAULT_PUBLISHER_NAMES if publisher_names is None else publisher_names)
+        self.author_indicators = [a.lower() for a in (DEFAULT_AUTHOR_INDICATORS if author_indicators is None else author_indicators)]
+
+        # Alternatives are tried left to right, so the first group that matches
+        # is the same pattern the old level-by-level loop would have returned
+        alternatives = []
+        self._group_levels = {}
+        for level, patterns in self.heading_patterns.items():
+            for i, pattern in enumerate(patterns):
+                name = f"{level}_{i}"
+                self._group_levels[name] = level.upper()
+                alternatives.append(f"(?P<{name}>{CAPTURING_GROUP_RE.sub('(?:', pattern)})")
+        self._heading_re = re.compile('|'.join(alternatives))
+
+        # An author name inside the line, or the line inside an author name
+        self._author_matcher = SubstringMatcher(self.author_indicators)
+        self._author_haystack = '\x00'.join(self.author_indicators)
+
+    def is_publisher_name(self, text: str) -> bool:
+        return text.lower().strip() in self.publisher_names
+
+    def is_author_name(self, text: str) -> bool:
+        if not self.author_indicators:
+            return False
+        text_lower = text.lower().strip()
+        return self._author_matcher.search(text_lower) or text_lower in self._author_haystack
+
+    def is_valid_heading(self, text: str) -> bool:
+        if not text or len(text) < 4:
+            return False
+
+        if self.is_publisher_name(text):
+            return False
+
+        if self.is_author_name(text):
+            return False
+
+        if len(text) > 150:
+            return False
+
+        if NUMERIC_RE.match(text):
+            return False
+
+        if SHORT_CAPS_RE.match(text) and len(text) < 8:
+            return False
+
+        if PERSON_NAME_RE.match(text):
+            return False
+
+        return True
+
+    def classify(self, line: str) -> Optional[str]:
+        line = line.strip()
+
+        if not self.is_valid_heading(line):
+            return None
+
+        match = self._heading_re.match(line)
+        if match is None:
+            return None
+        return self._group_levels[match.lastgroup]
+
+# JSON file of the form {"publishers": [...], "authors": [...]}; a missing key keeps the default
+def load_blocklists(path: str) -> Tuple[List[str], List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    publishers = [p.lower().strip() for p in data.get("publishers", DEFAULT_PUBLISHER_NAMES)]
+    authors = [a.lower().strip() for a in data.get("authors", DEFAULT_AUTHOR_INDICATORS)]
+    return publishers, authors
+
+_classifiers: Dict[Optional[str], HeadingClassifier] = {}
+
+def get_heading_classifier(blocklist_path: str = None) -> HeadingClassifier:
+    classifier = _classifiers.get(blocklist_path)
+    if classifier is None:
+        if blocklist_path:
+            publishers, authors = load_blocklists(blocklist_path)
+            classifier = HeadingClassifier(publisher_names=publishers, author_indicators=authors)
+        else:
+            classifier = HeadingClassifier()
+        _classifiers[blocklist_path] = classifier
+    return classifier
@@ -0,0 +1,146 @@
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import instrumentation
+from content_extractor import section_content
+from scoring_engine import MIN_SECTION_CHARS, tokenize
+
+# Sections are fingerprinted with MinHash over word 3-grams. LSH with 16 bands
+# of 4 rows makes pairs of about 0.5 similarity or more candidates; a candidate
+# is a duplicate when its estimated Jaccard similarity reaches 0.8.
+# On by default; ROUND1B_DEDUP=0 or --no-dedup ranks every section.
+ENABLED = os.environ.get("ROUND1B_DEDUP", "1") == "1"
+SHINGLE_WORDS = 3
+NUM_PERM = 64
+LSH_BANDS = 16
+DUPLICATE_THRESHOLD = 0.8
+# Shingles hashed per block, so a block holds SHINGLE_BLOCK x NUM_PERM integers
+SHINGLE_BLOCK = 4096
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(2025)
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+
+SectionRef = Tuple[Dict[str, Any], Dict[str, Any]]
+
+def configure(enabled: bool) -> None:
+    # Exported so process pool workers inherit the setting
+    global ENABLED
+    ENABLED = enabled
+    os.environ["ROUND1B_DEDUP"] = "1" if enabled else "0"
+
+class TokenHashes(dict):
+    # crc32 of each distinct token, computed on first use
+    def __missing__(self, token: str) -> int:
+        value = self[token] = zlib.crc32(token.encode("utf-8"))
+        return value
+
+def shingle_hashes(tokens: List[str], size: int = SHINGLE_WORDS, token_hashes: Optional[TokenHashes] = None) -> np.ndarray:
+    # 32-bit hash of every run of `size` consecutive words (one run for shorter texts)
+    if token_hashes is None:
+        token_hashes = TokenHashes()
+    hashes = np.fromiter(map(token_hashes.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+    size = min(size, len(hashes))
+    if not size:
+        return hashes
+    shingles = hashes[:len(hashes) - size + 1].copy()
+    for offset in range(1, size):
+        shingles = (shingles * np.uint64(1000003) + hashes[offset:len(hashes) - size + 1 + offset]) & np.uint64(0xFFFFFFFF)
+    return shingles
+
+def minhash(shingles: np.ndarray) -> np.ndarray:
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    for start in range(0, len(shingles), SHINGLE_BLOCK):
+        block = shingles[start:start + SHINGLE_BLOCK, None]
+        np.minimum(signature, ((block * _A + _B) % np.uint64(_PRIME)).min(axis=0), out=signature)
+    return signature
+
+class NearDuplicateIndex:
+    # Streaming LSH over section signatures. The first section of a group of
+    # near-duplicates is its representative and the later ones link to it. Only
+    # representatives go into the buckets, so every added section costs a fixed
+    # number of bucket probes however many copies of it came before.
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, bands: int = LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._representatives: List[SectionRef] = []
+        self._signatures: List[np.ndarray] = []
+        self._links: Dict[int, List[SectionRef]] = {}
+        self._duplicates = set()
+        self._token_hashes = TokenHashes()
+        # Time spent in add(), which callers may interleave with other work
+        self.seconds = 0.0
+
+    def add(self, content_data: Dict[str, Any], section: Dict[str, Any], text: str,
+            tokens: Optional[List[str]] = None) -> bool:
+        # Returns whether the section nearly duplicates one added before it;
+        # sections too short to be ranked are left out. Pass tokens when the
+        # caller has already tokenized text.
+        start = time.perf_counter()
+        try:
+            return self._add(content_data, section, text, tokens)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def _add(self, content_data: Dict[str, Any], section: Dict[str, Any], text: str,
+             tokens: Optional[List[str]]) -> bool:
+        if not text or len(text.strip()) < MIN_SECTION_CHARS:
+            return False
+        signature = minhash(shingle_hashes(tokenize(text) if tokens is None else tokens, token_hashes=self._token_hashes))
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        candidates = sorted({position for key in keys for position in self._buckets.get(key, ())})
+        if candidates:
+            similarity = (np.vstack([self._signatures[position] for position in candidates]) == signature).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= self.threshold:
+                representative = self._representatives[candidates[best]][1]
+                self._links.setdefault(id(representative), []).append((content_data, section))
+                self._duplicates.add(id(section))
+                return True
+        position = len(self._representatives)
+        self._representatives.append((content_data, section))
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(position)
+        return False
+
+    def is_duplicate(self, section: Dict[str, Any]) -> bool:
+        return id(section) in self._duplicates
+
+    def duplicates_of(self, section: Dict[str, Any]) -> List[SectionRef]:
+        return self._links.get(id(section), [])
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self._duplicates)
+
+def duplicate_index() -> Optional[NearDuplicateIndex]:
+    # An empty index to fill, or None when deduplication is off
+    return NearDuplicateIndex() if ENABLED else None
+
+def find_near_duplicates(content_datas: Iterable[Dict[str, Any]]) -> Optional[NearDuplicateIndex]:
+    # Sections in input order, so the copy kept does not depend on which
+    # document finished parsing first. The BM25 index does this itself while
+    # tokenizing (see SectionIndex.add_document); this is for the legacy score.
+    duplicates = duplicate_index()
+    if duplicates is None:
+        return None
+    with instrumentation.stage("deduplicate"):
+        for content_data in content_datas:
+            for section in content_data.get("content", []):
+                duplicates.add(content_data, section, section_content(content_data, section))
+    return duplicates
+
+def duplicate_links(duplicates: NearDuplicateIndex, section: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Output entries for the sections collapsed into `section`
+    return [{
+        "document": content_data.get("title", ""),
+        "page_number": duplicate.get("page", 0),
+        "section_title": duplicate.get("heading", "")
+    } for content_data, duplicate in duplicates.duplicates_of(section)]
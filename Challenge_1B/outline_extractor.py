@@ -1,127 +1,131 @@
 import json
-import fitz
-import re
 import os
-from typing import List, Dict, Any
+import fitz
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import instrumentation
+from heading_classifier import get_heading_classifier
+from document_parser import document_title, iter_pages
 
-class OutlineExtractor:
-    def __init__(self):
-        self.publisher_names = {
-            'wiley', 'elsevier', 'springer', 'taylor', 'francis', 'sage', 'emerald', 
-            'blackwell', 'oxford', 'cambridge', 'mit', 'ieee', 'acm', 'ssrn', 'arxiv',
-            'biorxiv', 'medrxiv', 'chemrxiv', 'authorea', 'research square', 'sciety',
-            'prereview', 'review commons', 'asapbio', 'elife', 'reseach square'
-        }
-        
-        self.author_indicators = [
-            'liu jingyi', 'yang heng', 'chu jingli', 'andrea zini', 'beate weyland',
-            'uwe flick', 'ernst von kardorff', 'ines steinke', 'werner meinefeld',
-            'jo reichertz', 'hans merkens', 'udo kelle', 'christian erzberger',
-            'stephan wolff', 'christel hopf', 'hubert knoblauch', 'alessia bartolini',
-            'federico batini', 'mina de santis', 'marco milella', 'pierluigi malavasi'
-        ]
+# A PDF's own bookmarks (doc.get_toc()) replace the line heuristic when at least
+# TOC_MIN_ENTRIES of them point at real pages. The heuristic then only scans
+# runs of more than TOC_GAP_PAGES pages that no bookmark points into.
+TOC_MIN_ENTRIES = 3
+TOC_GAP_PAGES = 10
+TOC_MAX_LEVEL = 3
+
+class BookmarkOutline:
+    def __init__(self, headings: List[Dict[str, Any]], page_count: int):
+        self.headings = headings
+        self.by_page: Dict[int, List[Dict[str, Any]]] = {}
+        for heading in headings:
+            self.by_page.setdefault(heading["page"], []).append(heading)
         
-        self.heading_patterns = {
-            'h1': [
-                r'^(?:\d+\.)?\s*([A-Z][A-Z\s]{3,50})$',
-                r'^(?:\d+\.)?\s*([A-Z][a-z\s]{4,100})$',
-                r'^(?:Chapter|Section|Part)\s+\d+[:\s]+([A-Z][A-Za-z\s]{4,100})$',
-                r'^([A-Z][A-Za-z\s]{4,100})\s*$'
-            ],
-            'h2': [
-                r'^(?:\d+\.\d+)?\s*([A-Z][A-Z\s]{3,50})$',
-                r'^(?:\d+\.\d+)?\s*([A-Z][a-z\s]{4,100})$',
-                r'^(?:Subsection|Subchapter)\s+\d+[:\s]+([A-Z][A-Za-z\s]{4,100})$'
-            ],
-            'h3': [
-                r'^(?:\d+\.\d+\.\d+)?\s*([A-Z][A-Z\s]{3,50})$',
-                r'^(?:\d+\.\d+\.\d+)?\s*([A-Z][a-z\s]{4,100})$'
-            ]
-        }
+        # 0-based [start, stop) page ranges left to the heuristic
+        self.gap_ranges = []
+        pages = sorted(self.by_page)
+        for prev, nxt in zip([0] + pages, pages + [page_count + 1]):
+            if nxt - prev - 1 > TOC_GAP_PAGES:
+                self.gap_ranges.append((prev, nxt - 1))
+        self._gap_pages = {page for start, stop in self.gap_ranges for page in range(start, stop)}
+    
+    def page_headings(self, page_num: int) -> List[Dict[str, Any]]:
+        return list(self.by_page.get(page_num + 1, []))
+    
+    def needs_scan(self, page_num: int) -> bool:
+        return page_num in self._gap_pages
+
+def bookmark_outline(toc: List[List[Any]], page_count: int) -> Optional[BookmarkOutline]:
+    # None when the bookmarks are missing or too sparse to stand in for the heuristic
+    headings = []
+    for entry in toc or []:
+        level, title, page = entry[:3]
+        title = " ".join(str(title).split())
+        if title and 1 <= page <= page_count:
+            headings.append({
+                "level": f"H{min(max(level, 1), TOC_MAX_LEVEL)}",
+                "text": title,
+                "page": page
+            })
+    if len(headings) < TOC_MIN_ENTRIES:
+        return None
+    headings.sort(key=lambda h: h["page"])
+    return BookmarkOutline(headings, page_count)
+
+class OutlineExtractor:
+    def __init__(self, blocklist_path: str = None):
+        self.classifier = get_heading_classifier(blocklist_path)
+        self.publisher_names = self.classifier.publisher_names
+        self.author_indicators = self.classifier.author_indicators
+        self.heading_patterns = self.classifier.heading_patterns
         
     def _is_publisher_name(self, text: str) -> bool:
-        text_lower = text.lower().strip()
-        return text_lower in self.publisher_names
+        return self.classifier.is_publisher_name(text)
     
     def _is_author_name(self, text: str) -> bool:
-        text_lower = text.lower().strip()
-        for author in self.author_indicators:
-            if author in text_lower or text_lower in author:
-                return True
-        return False
+        return self.classifier.is_author_name(text)
     
     def _is_valid_heading(self, text: str) -> bool:
-        if not text or len(text) < 4:
-            return False
-            
-        if self._is_publisher_name(text):
-            return False
-            
-        if self._is_author_name(text):
-            return False
-            
-        if len(text) > 150:
-            return False
-            
-        if re.match(r'^\d+$', text):
-            return False
-            
-        if re.match(r'^[A-Z\s]{2,}$', text) and len(text) < 8:
-            return False
-            
-        if re.match(r'^[A-Z][a-z]+\s+[A-Z][a-z]+$', text):
-            return False
-            
-        return True
+        return self.classifier.is_valid_heading(text)
     
     def _classify_heading(self, line: str) -> str:
-        line = line.strip()
-        
-        if not self._is_valid_heading(line):
-            return None
-        
-        for level, patterns in self.heading_patterns.items():
-            for pattern in patterns:
-                if re.match(pattern, line):
-                    return level.upper()
-        
-        return None
+        return self.classifier.classify(line)
     
-    def extract_outline(self, pdf_path: str) -> Dict[str, Any]:
-        doc = fitz.open(pdf_path)
-        outline = []
+    def page_headings(self, text: str, page_num: int) -> List[Dict[str, Any]]:
+        headings = []
         
-        title = doc.metadata.get('title', '')
-        if not title:
-            title = os.path.basename(pdf_path).replace('.pdf', '')
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            lines = text.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                heading_level = self._classify_heading(line)
-                if heading_level:
-                    outline.append({
-                        "level": heading_level,
-                        "text": line,
-                        "page": page_num + 1
-                    })
-        
-        doc.close()
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+                
+            heading_level = self._classify_heading(line)
+            if heading_level:
+                headings.append({
+                    "level": heading_level,
+                    "text": line,
+                    "page": page_num + 1
+                })
         
+        return headings
+    
+    def iter_page_headings(self, pages: Iterable[Tuple[int, str]], document: str = None,
+                           bookmarks: BookmarkOutline = None) -> Iterator[Tuple[int, str, List[Dict[str, Any]]]]:
+        # Passes each page on together with the headings found on it; with
+        # bookmarks, those are its bookmarks and only gap pages are scanned
+        for page_num, text in pages:
+            if bookmarks is None:
+                with instrumentation.stage("extract_outline", document):
+                    headings = self.page_headings(text, page_num)
+            else:
+                headings = bookmarks.page_headings(page_num)
+                if bookmarks.needs_scan(page_num):
+                    with instrumentation.stage("extract_outline", document):
+                        headings.extend(self.page_headings(text, page_num))
+            yield page_num, text, headings
+    
+    def extract_outline_from_pages(self, pages: Iterable[Tuple[int, str]], title: str,
+                                   bookmarks: BookmarkOutline = None) -> Dict[str, Any]:
+        # With bookmarks, `pages` only needs to hold the gap pages
+        outline = [heading for _, _, headings in self.iter_page_headings(pages) for heading in headings]
+        if bookmarks is not None:
+            outline = sorted(bookmarks.headings + outline, key=lambda h: h["page"])
         return {
             "title": title,
             "outline": outline
         }
+    
+    def extract_outline(self, pdf_path: str) -> Dict[str, Any]:
+        # A fully bookmarked PDF is outlined without reading any page text
+        with fitz.open(pdf_path) as doc:
+            title = document_title(doc.metadata, pdf_path)
+            bookmarks = bookmark_outline(doc.get_toc(), len(doc))
+            if bookmarks is None:
+                return self.extract_outline_from_pages(iter_pages(doc), title)
+            gap_pages = (page for start, stop in bookmarks.gap_ranges for page in iter_pages(doc, None, start, stop))
+            return self.extract_outline_from_pages(gap_pages, title, bookmarks)
 
-def extract_outline_from_pdf(pdf_path: str) -> Dict[str, Any]:
-    extractor = OutlineExtractor()
+def extract_outline_from_pdf(pdf_path: str, blocklist_path: str = None) -> Dict[str, Any]:
+    extractor = OutlineExtractor(blocklist_path)
     return extractor.extract_outline(pdf_path)
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+from manifest import OUTLINE_VERSION, file_digest, outline_version
+
+# Every Challenge_1A run leaves <output>/.manifest:
+# {"pipeline_version": ..., "files": {pdf name: {"sha256", "size", "mtime_ns", "output"}}}
+MANIFEST_NAME = ".manifest"
+
+class PrecomputedOutlines:
+    # Outline JSON written by Challenge_1A for the same corpus, found by PDF
+    # content hash: a renamed copy still matches, an edited PDF does not
+    def __init__(self, outline_dir: str):
+        self.outline_dir = outline_dir
+        self.outputs: Dict[str, str] = {}
+        manifest_path = os.path.join(outline_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            version = outline_version(data.get("pipeline_version", ""))
+            if version != str(OUTLINE_VERSION):
+                print(f"Outlines in {outline_dir} are from Challenge_1A outline version {version or '?'}, "
+                      f"not {OUTLINE_VERSION}; computing outlines")
+                return
+            for entry in data.get("files", {}).values():
+                if entry.get("sha256") and entry.get("output"):
+                    self.outputs[entry["sha256"]] = entry["output"]
+        except FileNotFoundError:
+            print(f"No {MANIFEST_NAME} in {outline_dir} (written by every Challenge_1A run); computing outlines")
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable {manifest_path}: {e}")
+    
+    def __len__(self) -> int:
+        return len(self.outputs)
+    
+    def lookup(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        # {"title", "outline"} as Challenge_1A wrote it, or None to compute one
+        if not self.outputs:
+            return None
+        output = self.outputs.get(file_digest(pdf_path))
+        if output is None:
+            return None
+        try:
+            with open(os.path.join(self.outline_dir, output), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get("outline"), list):
+            return None
+        return {
+            "title": data.get("title", ""),
+            "outline": [
+                heading for heading in data["outline"]
+                if isinstance(heading, dict) and heading.get("text") and isinstance(heading.get("page"), int)
+            ]
+        }
@@ -0,0 +1,250 @@
+"""
+Round 1B query server
+
+Parses and indexes the input directory once, keeps the section store in memory
+and answers persona_job_input.json-shaped requests with the round1b_output.json
+schema. Changed, added and removed PDFs are picked up by a background reload.
+
+Usage:
+    python3 query_server.py [--input-dir input] [--port 8080] [--socket /tmp/round1b.sock]
+
+    curl -X POST --data @persona_job_input.json http://127.0.0.1:8080/rank
+    curl --unix-socket /tmp/round1b.sock -X POST --data @persona_job_input.json http://localhost/rank
+
+A JSON list of personas is ranked as one batch and answered with a list of outputs.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# instrumentation.py and manifest.py are shared by both challenges and live in <repo>/shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+import near_duplicates
+from near_duplicates import find_near_duplicates
+from relevance_ranker import RelevanceRanker, SCORING_MODES
+from round1b_main import BLOCKLIST_PATH, REQUIRED_PERSONA_KEYS, Round1BSolution
+
+RELOAD_INTERVAL = 30.0
+MAX_REQUEST_BYTES = 1 << 20
+
+def file_signature(path: str) -> Tuple[float, int]:
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+class CorpusStore:
+    # Parsed documents plus the persona-independent BM25 index, or for legacy
+    # scoring the near-duplicate groups. Each reload builds a new snapshot and
+    # swaps it in, so queries never see a half-built one.
+    def __init__(self, input_dir: str = "input", scoring: str = "bm25", max_workers: int = 1,
+                 include_content: bool = False, blocklist_path: str = None):
+        self.solution = Round1BSolution(input_dir, scoring=scoring, max_workers=max_workers,
+                                        include_content=include_content, blocklist_path=blocklist_path)
+        self.solution.load_persona_data()
+        self.scoring = scoring
+        self._signatures: Dict[str, Tuple[float, int]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._reload_lock = threading.Lock()
+        self._snapshot: Tuple[List[Dict[str, Any]], Any, Any] = ([], None, None)
+        self.loaded_at = None
+
+    def reload(self) -> bool:
+        # Re-parses only files whose mtime/size changed; returns whether the corpus did
+        with self._reload_lock:
+            signatures = {}
+            for pdf_path in sorted(self.solution.get_pdf_files()):
+                try:
+                    signatures[pdf_path] = file_signature(pdf_path)
+                except OSError:
+                    continue
+
+            changed = [p for p, sig in signatures.items() if self._signatures.get(p) != sig]
+            removed = [p for p in self._results if p not in signatures]
+            if not changed and not removed and self.loaded_at is not None:
+                return False
+
+            for pdf_path in removed:
+                self._results.pop(pdf_path, None)
+            parsed = set()
+            for result in self.solution.process_pdfs(changed):
+                self._results[result["pdf_path"]] = result
+                parsed.add(result["pdf_path"])
+            # A file that failed to parse keeps its previous result and signature
+            # (or gets none), so the next reload tries it again
+            for pdf_path in parsed:
+                self._signatures[pdf_path] = signatures[pdf_path]
+            for pdf_path in removed:
+                self._signatures.pop(pdf_path, None)
+            failed = len(changed) - len(parsed)
+            if not parsed and not removed and self.loaded_at is not None:
+                print(f"{failed} changed documents failed to parse; keeping the loaded corpus")
+                return False
+
+            results = [self._results[p] for p in sorted(self._results)]
+            index = duplicates = None
+            content_datas = [result["content"] for result in results]
+            if self.scoring == "bm25":
+                ranker = RelevanceRanker(self.solution.persona_data, self.scoring)
+                index = ranker.build_index(content_datas)
+            else:
+                duplicates = find_near_duplicates(content_datas)
+
+            self._snapshot = (results, index, duplicates)
+            self.loaded_at = datetime.datetime.now().isoformat()
+            print(f"Loaded {len(results)} documents ({len(parsed)} parsed, {failed} failed, {len(removed)} removed)")
+            return True
+
+    def query(self, persona_data: Dict[str, Any]) -> Dict[str, Any]:
+        results, index, duplicates = self._snapshot
+        # Ranking writes its lists into the result dicts, so rank shallow copies
+        results = self.solution.rank_results([dict(result) for result in results], persona_data, index, duplicates)
+        return self.solution.generate_final_output(results, persona_data)
+
+    def query_many(self, personas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results, index, duplicates = self._snapshot
+        aggregators = self.solution.rank_results_for_personas(results, personas, index, duplicates)
+        return [self.solution.build_final_output(aggregator, persona_data)
+                for persona_data, aggregator in zip(personas, aggregators)]
+
+    def status(self) -> Dict[str, Any]:
+        results, index, _ = self._snapshot
+        return {
+            "documents": [result["pdf_name"] for result in results],
+            "sections_indexed": len(index.sections) if index is not None else None,
+            "scoring": self.scoring,
+            "loaded_at": self.loaded_at
+        }
+
+class Reloader(threading.Thread):
+    def __init__(self, store: CorpusStore, interval: float = RELOAD_INTERVAL):
+        super().__init__(daemon=True)
+        self.store = store
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.store.reload()
+            except Exception as e:
+                print(f"Reload failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+class QueryHandler(BaseHTTPRequestHandler):
+    store: CorpusStore = None
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/health", "/status"):
+            self._send_json(200, self.store.status())
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("", "/rank"):
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self._send_json(400, {"error": "Request body must be a persona JSON object"})
+            return
+
+        try:
+            persona_data = json.loads(self.rfile.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+        # A list of personas is ranked as one batch and answered with a list of outputs
+        personas = persona_data if isinstance(persona_data, list) else [persona_data]
+        if not personas or any(not isinstance(p, dict) or any(key not in p for key in REQUIRED_PERSONA_KEYS) for p in personas):
+            self._send_json(400, {"error": f"Persona JSON must contain {', '.join(REQUIRED_PERSONA_KEYS)}"})
+            return
+
+        try:
+            if isinstance(persona_data, list):
+                self._send_json(200, self.store.query_many(personas))
+            else:
+                self._send_json(200, self.store.query(persona_data))
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+def create_server(store: CorpusStore, host: str = "127.0.0.1", port: int = 8080,
+                  socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    handler = type("BoundQueryHandler", (QueryHandler,), {"store": store})
+    if socket_path:
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input-dir", default="input")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--socket", help="serve on this Unix socket instead of TCP")
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL,
+                        help="seconds between input directory scans (0 disables reloading)")
+    parser.add_argument("--scoring", choices=SCORING_MODES, default="bm25")
+    parser.add_argument("--workers", type=int, default=1, help="PDFs parsed in parallel on reload (0 = one per CPU)")
+    parser.add_argument("--include-content", action="store_true",
+                        help="keep each extracted section's full text in responses")
+    parser.add_argument("--blocklist", default=BLOCKLIST_PATH,
+                        help="JSON of publisher names and author indicators that are never headings (also ROUND1B_BLOCKLIST)")
+    parser.add_argument("--no-dedup", action="store_true", default=not near_duplicates.ENABLED,
+                        help="rank near-duplicate sections separately instead of collapsing them (also ROUND1B_DEDUP=0)")
+    args = parser.parse_args()
+
+    near_duplicates.configure(not args.no_dedup)
+
+    store = CorpusStore(args.input_dir, args.scoring, args.workers, args.include_content, args.blocklist)
+    store.reload()
+
+    reloader = None
+    if args.reload_interval > 0:
+        reloader = Reloader(store, args.reload_interval)
+        reloader.start()
+
+    server = create_server(store, args.host, args.port, args.socket)
+    print(f"Serving on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if reloader is not None:
+            reloader.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
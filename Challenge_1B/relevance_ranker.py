@@ -1,10 +1,24 @@
 import json
 import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from collections import Counter
+import numpy as np
+from content_extractor import SECTION_REF, ranked_content, section_content
+from near_duplicates import NearDuplicateIndex, duplicate_index, duplicate_links, find_near_duplicates
+from scoring_engine import QUALITY_WEIGHT, SectionIndex, build_index
+from text_chunker import MAX_CHUNK_CHARS, iter_chunks
+
+SCORING_MODES = ("bm25", "legacy")
 
 class RelevanceRanker:
-    def __init__(self, persona_data: Dict[str, Any]):
+    # scoring="bm25" ranks through a SectionIndex built over every document;
+    # scoring="legacy" keeps the original substring keyword-density score.
+    def __init__(self, persona_data: Dict[str, Any], scoring: str = "bm25"):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring}")
+        self.scoring = scoring
+        self.index = None
+        self.query = None
         self.persona = persona_data.get("persona", "")
         self.job = persona_data.get("job_to_be_done", "")
         self.focus_areas = persona_data.get("focus_areas", [])
@@ -101,86 +115,191 @@ class RelevanceRanker:
         return min(relevance_score, 10.0)
     
     def calculate_relevance_score(self, text: str, heading: str = "") -> float:
+        if self.scoring == "bm25" and self.index is not None and not heading:
+            return self.calculate_relevance_scores([text])[0]
         return self._calculate_content_relevance(text, heading)
     
-    def rank_sections(self, content_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        ranked_sections = []
+    def calculate_relevance_scores(self, texts: List[str]) -> List[float]:
+        # Batch scoring of texts outside the index (sub-sections) against its statistics
+        if self.scoring != "bm25" or self.index is None:
+            return [self._calculate_content_relevance(text) for text in texts]
+        scores = self.index.score_texts(texts, self.query)
+        return [score + QUALITY_WEIGHT * self._calculate_text_quality(text) for score, text in zip(scores, texts)]
+    
+    def build_index(self, content_datas: List[Dict[str, Any]]) -> SectionIndex:
+        # Near-duplicate sections are collapsed as they are tokenized and never indexed
+        self.index = build_index(content_datas, self._calculate_text_quality, duplicate_index())
+        self.query = self.index.query_vector(self.keywords)
+        return self.index
+    
+    def rank_documents(self, content_datas: List[Dict[str, Any]],
+                       duplicates: Optional[NearDuplicateIndex] = None) -> List[List[Dict[str, Any]]]:
+        # Ranked sections per document, in input order; BM25 statistics span all
+        # of them. Legacy scoring takes duplicates found earlier over the same
+        # content_datas, or finds them here.
+        if self.scoring == "legacy":
+            if duplicates is None:
+                duplicates = find_near_duplicates(content_datas)
+            return [self._rank_sections_legacy(content_data, duplicates) for content_data in content_datas]
         
-        for section in content_data.get("content", []):
-            content = section.get("content", "")
-            heading = section.get("heading", "")
-            
-            if not content or len(content.strip()) < 50:
-                continue
-            
-            relevance_score = self.calculate_relevance_score(content, heading)
-            
-            if relevance_score > 0.01:
-                ranked_sections.append({
+        self.build_index(content_datas)
+        return self.rank_indexed(content_datas)
+    
+    def use_index(self, index: SectionIndex) -> None:
+        # Rank against an index built elsewhere (e.g. shared by a long-running server)
+        self.index = index
+        self.query = index.query_vector(self.keywords)
+    
+    def rank_indexed(self, content_datas: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        return self.rank_scored(content_datas, self.index.score(self.query))
+    
+    def rank_scored(self, content_datas: List[Dict[str, Any]], scores: np.ndarray) -> List[List[Dict[str, Any]]]:
+        # Ranked sections per document from one score per index section
+        ranked = {id(content_data): [] for content_data in content_datas}
+        for (content_data, section), score in zip(self.index.sections, scores):
+            if score > 0.01:
+                ranked[id(content_data)].append({
                     "document": content_data.get("title", ""),
                     "page_number": section.get("page", 0),
-                    "section_title": heading,
-                    "importance_rank": relevance_score,
+                    "section_title": section.get("heading", ""),
+                    "importance_rank": float(score),
                     "level": section.get("level", ""),
-                    "content": content
+                    SECTION_REF: section
                 })
         
+        results = []
+        for content_data in content_datas:
+            ranked_sections = ranked[id(content_data)]
+            ranked_sections.sort(key=lambda x: x["importance_rank"], reverse=True)
+            if self.index.duplicates is not None:
+                self.link_duplicates(ranked_sections, self.index.duplicates)
+            results.append(ranked_sections)
+        return results
+    
+    def rank_sections(self, content_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.rank_documents([content_data])[0]
+    
+    def _rank_sections_legacy(self, content_data: Dict[str, Any],
+                              duplicates: Optional[NearDuplicateIndex] = None) -> List[Dict[str, Any]]:
+        ranked_sections = []
+        
+        for section in content_data.get("content", []):
+            if duplicates is not None and duplicates.is_duplicate(section):
+                continue
+            ranked = self.rank_section_legacy(content_data.get("title", ""), section, section_content(content_data, section))
+            if ranked is not None:
+                ranked_sections.append(ranked)
+        
         ranked_sections.sort(key=lambda x: x["importance_rank"], reverse=True)
+        if duplicates is not None:
+            self.link_duplicates(ranked_sections, duplicates)
         
         return ranked_sections
     
-    def extract_sub_sections(self, content: str, max_length: int = 300) -> List[str]:
-        if not content:
-            return []
-        
-        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
+    def link_duplicates(self, ranked_sections: List[Dict[str, Any]], duplicates: NearDuplicateIndex) -> None:
+        # Each kept section lists the near-duplicates that were collapsed into it
+        for ranked in ranked_sections:
+            links = duplicate_links(duplicates, ranked[SECTION_REF])
+            if links:
+                ranked["duplicates"] = links
+    
+    def rank_section_legacy(self, title: str, section: Dict[str, Any], content: str) -> Optional[Dict[str, Any]]:
+        # Legacy scores need nothing beyond the section itself, so sections can
+        # be scored as they are assembled
+        heading = section.get("heading", "")
         
-        sub_sections = []
-        current_section = ""
+        if not content or len(content.strip()) < 50:
+            return None
         
-        for paragraph in paragraphs:
-            if len(paragraph) < 20:
-                continue
-                
-            if len(current_section + paragraph) < max_length:
-                current_section += paragraph + "\n\n"
-            else:
-                if current_section and len(current_section.strip()) > 50:
-                    sub_sections.append(current_section.strip())
-                current_section = paragraph + "\n\n"
+        relevance_score = self.calculate_relevance_score(content, heading)
         
-        if current_section and len(current_section.strip()) > 50:
-            sub_sections.append(current_section.strip())
-        
-        return sub_sections
+        if relevance_score <= 0.01:
+            return None
+        return {
+            "document": title,
+            "page_number": section.get("page", 0),
+            "section_title": heading,
+            "importance_rank": relevance_score,
+            "level": section.get("level", ""),
+            SECTION_REF: section
+        }
+    
+    def extract_sub_sections(self, content: str, max_length: int = MAX_CHUNK_CHARS) -> List[str]:
+        # Overlapping windows of whole sentences (see text_chunker); section
+        # text is whitespace-collapsed, so there are no paragraphs to split on
+        return list(iter_chunks(content, max_length))
     
-    def analyze_sub_sections(self, ranked_sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def analyze_sub_sections(self, ranked_sections: List[Dict[str, Any]],
+                             content_data: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         sub_section_analysis = []
         
-        for section in ranked_sections[:15]:
-            content = section.get("content", "")
-            sub_sections = self.extract_sub_sections(content)
-            
-            for i, sub_section in enumerate(sub_sections):
-                relevance_score = self.calculate_relevance_score(sub_section)
-                
-                if relevance_score > 0.01:
-                    sub_section_analysis.append({
-                        "document": section.get("document", ""),
-                        "page_number": section.get("page_number", 0),
-                        "refined_text": sub_section[:200] + "..." if len(sub_section) > 200 else sub_section,
-                        "importance_rank": relevance_score,
-                        "parent_section": section.get("section_title", "")
-                    })
+        # Sub-sections of all top sections are scored in one batch; only these
+        # sections' text is sliced out of the document here
+        candidates = [(section, sub_section) for section in ranked_sections[:15]
+                      for sub_section in iter_chunks(ranked_content(content_data, section))]
+        scores = self.calculate_relevance_scores([sub_section for _, sub_section in candidates])
+        
+        for (section, sub_section), relevance_score in zip(candidates, scores):
+            if relevance_score > 0.01:
+                sub_section_analysis.append({
+                    "document": section.get("document", ""),
+                    "page_number": section.get("page_number", 0),
+                    "refined_text": sub_section[:200] + "..." if len(sub_section) > 200 else sub_section,
+                    "importance_rank": relevance_score,
+                    "parent_section": section.get("section_title", "")
+                })
         
         sub_section_analysis.sort(key=lambda x: x["importance_rank"], reverse=True)
         
         return sub_section_analysis[:25]
 
-def rank_content_for_persona(content_data: Dict[str, Any], persona_data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    ranker = RelevanceRanker(persona_data)
+def rank_content_for_persona(content_data: Dict[str, Any], persona_data: Dict[str, Any], scoring: str = "bm25") -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    ranker = RelevanceRanker(persona_data, scoring)
     
     ranked_sections = ranker.rank_sections(content_data)
-    sub_section_analysis = ranker.analyze_sub_sections(ranked_sections)
+    sub_section_analysis = ranker.analyze_sub_sections(ranked_sections, content_data)
+    
+    return ranked_sections, sub_section_analysis
+
+def rank_corpus_for_persona(content_datas: List[Dict[str, Any]], persona_data: Dict[str, Any], scoring: str = "bm25",
+                            index: Optional[SectionIndex] = None,
+                            duplicates: Optional[NearDuplicateIndex] = None) -> List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    ranker = RelevanceRanker(persona_data, scoring)
+    
+    if index is not None and scoring == "bm25":
+        ranker.use_index(index)
+        ranked_documents = ranker.rank_indexed(content_datas)
+    else:
+        ranked_documents = ranker.rank_documents(content_datas, duplicates)
+    
+    results = []
+    for content_data, ranked_sections in zip(content_datas, ranked_documents):
+        results.append((ranked_sections, ranker.analyze_sub_sections(ranked_sections, content_data)))
+    
+    return results 
+
+def rank_corpus_for_personas(content_datas: List[Dict[str, Any]], personas: List[Dict[str, Any]], scoring: str = "bm25",
+                             index: Optional[SectionIndex] = None,
+                             duplicates: Optional[NearDuplicateIndex] = None) -> List[List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]]:
+    # rank_corpus_for_persona for several personas at once: one index over the
+    # corpus, and every section scored against every persona in one matrix product
+    if scoring == "legacy":
+        if duplicates is None:
+            duplicates = find_near_duplicates(content_datas)
+        return [rank_corpus_for_persona(content_datas, persona_data, scoring, duplicates=duplicates) for persona_data in personas]
+    
+    rankers = [RelevanceRanker(persona_data, scoring) for persona_data in personas]
+    if not rankers:
+        return []
+    if index is None:
+        index = build_index(content_datas, rankers[0]._calculate_text_quality, duplicate_index())
+    for ranker in rankers:
+        ranker.use_index(index)
+    scores = index.score_many(np.vstack([ranker.query for ranker in rankers]))
     
-    return ranked_sections, sub_section_analysis 
\ No newline at end of file
+    results = []
+    for ranker, persona_scores in zip(rankers, scores):
+        ranked_documents = ranker.rank_scored(content_datas, persona_scores)
+        results.append([(ranked_sections, ranker.analyze_sub_sections(ranked_sections, content_data))
+                        for content_data, ranked_sections in zip(content_datas, ranked_documents)])
+    return results
@@ -0,0 +1,74 @@
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+from content_extractor import SECTION_REF, ranked_content
+
+SECTION_LIMIT = 50
+SUB_SECTION_LIMIT = 30
+
+class TopK:
+    # Bounded min-heap of the `limit` highest-scoring items. Every item carries
+    # an order key (document index, position in that document's ranking); ties
+    # go to the smaller key, which is what a stable descending sort over the
+    # concatenated per-document lists gave, whatever order documents arrive in.
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.total = 0
+        self._heap: List[Tuple[float, Tuple[int, int], Dict[str, Any]]] = []
+
+    def accepts(self, score: float, order: Tuple[int, int]) -> bool:
+        if self.limit <= 0:
+            return False
+        if len(self._heap) < self.limit:
+            return True
+        return (score, (-order[0], -order[1])) > self._heap[0][:2]
+
+    def push(self, score: float, order: Tuple[int, int], item: Dict[str, Any]) -> None:
+        entry = (score, (-order[0], -order[1]), item)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Dict[str, Any]]:
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+class ResultAggregator:
+    # Streaming merge of per-document ranking results into the final top-K lists.
+    # Only entries that make the cut are kept, without their full section text
+    # unless include_content is set; everything else is dropped on arrival. Ranked
+    # sections reference their text (SECTION_REF), so with include_content only
+    # the entries a heap accepts have it sliced out of the document.
+    def __init__(self, section_limit: int = SECTION_LIMIT, sub_section_limit: int = SUB_SECTION_LIMIT,
+                 include_content: bool = False):
+        self.include_content = include_content
+        self.sections = TopK(section_limit)
+        self.sub_sections = TopK(sub_section_limit)
+        self._documents: List[Tuple[int, str]] = []
+
+    def _offer(self, top: TopK, items: List[Dict[str, Any]], order: int,
+               content_data: Optional[Dict[str, Any]], with_content: bool) -> None:
+        for position, item in enumerate(items):
+            top.total += 1
+            score = item["importance_rank"]
+            if not top.accepts(score, (order, position)):
+                continue
+            if SECTION_REF in item or (not with_content and "content" in item):
+                entry = {key: value for key, value in item.items() if key not in (SECTION_REF, "content")}
+                if with_content:
+                    entry["content"] = ranked_content(content_data, item)
+                item = entry
+            top.push(score, (order, position), item)
+
+    def add(self, result: Dict[str, Any], order: int) -> None:
+        self._documents.append((order, result["pdf_name"]))
+        content_data = result.get("content")
+        self._offer(self.sections, result.get("ranked_sections", []), order, content_data, self.include_content)
+        self._offer(self.sub_sections, result.get("sub_section_analysis", []), order, content_data, False)
+
+    @property
+    def document_count(self) -> int:
+        return len(self._documents)
+
+    @property
+    def input_documents(self) -> List[str]:
+        return [name for _, name in sorted(self._documents)]
@@ -6,19 +6,60 @@ This script processes multiple PDFs, extracts content, and ranks sections/sub-se
 based on a specific persona and job-to-be-done.
 """
 
+import argparse
 import json
 import os
+import re
+import sys
 import glob
 import datetime
-from typing import List, Dict, Any
-from outline_extractor import extract_outline_from_pdf
-from content_extractor import extract_content_from_pdf_with_outline
-from relevance_ranker import rank_content_for_persona
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterator, Tuple
+# instrumentation.py and manifest.py are shared by both challenges and live in <repo>/shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+import instrumentation
+import near_duplicates
+from document_pipeline import SHARD_PAGES, page_count, read_shard, shard_ranges, stream_document
+from relevance_ranker import SCORING_MODES, RelevanceRanker, rank_content_for_persona, rank_corpus_for_persona, rank_corpus_for_personas
+from document_store import DocumentStore
+from precomputed_outlines import PrecomputedOutlines
+from result_aggregator import ResultAggregator
+from manifest import OUTLINE_VERSION, file_digest
+from near_duplicates import NearDuplicateIndex
+from scoring_engine import SectionIndex
+
+# Bump when parsing, outline or content extraction changes, so incremental
+# runs rebuild their stored documents once
+PIPELINE_VERSION = 3
+# Stored per-document results for incremental runs; kept out of the output
+# directory, which holds only the deliverable JSON
+CACHE_DIR = os.environ.get("ROUND1B_CACHE_DIR", os.path.join(".cache", "round1b"))
+# JSON file of publisher names and author indicators that are never headings
+# (see heading_classifier.load_blocklists); the built-in lists when unset
+BLOCKLIST_PATH = os.environ.get("ROUND1B_BLOCKLIST")
+REQUIRED_PERSONA_KEYS = ("persona", "job_to_be_done")
 
 class Round1BSolution:
-    def __init__(self, input_dir: str = "input", output_dir: str = "output"):
+    def __init__(self, input_dir: str = "input", output_dir: str = "output", scoring: str = "bm25",
+                 max_workers: int = 1, include_content: bool = False, incremental: bool = False,
+                 cache_dir: str = None, shard_pages: int = SHARD_PAGES, outline_dir: str = None,
+                 blocklist_path: str = None):
         self.input_dir = input_dir
         self.output_dir = output_dir
+        self.scoring = scoring
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.include_content = include_content
+        self.shard_pages = shard_pages
+        self.blocklist_path = blocklist_path
+        # Challenge_1A outlines of the same PDFs, used instead of 1B's own heading detection
+        self.outlines = PrecomputedOutlines(outline_dir) if outline_dir else None
+        # Incremental runs reuse stored outline/content for unchanged PDFs; taking
+        # outlines from Challenge_1A (and which version of them) or not is part
+        # of the stored version, as is the content of a custom blocklist
+        version = f"{PIPELINE_VERSION}:1a{OUTLINE_VERSION}" if outline_dir else str(PIPELINE_VERSION)
+        if blocklist_path:
+            version += f":blocklist{file_digest(blocklist_path)[:16]}"
+        self.store = DocumentStore(cache_dir or CACHE_DIR, version) if incremental else None
         self.persona_data = None
         
     def load_persona_data(self, persona_file: str = "persona_job_input.json") -> Dict[str, Any]:
@@ -38,69 +79,237 @@ class Round1BSolution:
         
         return self.persona_data
     
+    def load_personas(self, personas_file: str) -> List[Dict[str, Any]]:
+        # A JSON list of persona_job_input.json-shaped specs, or {"personas": [...]}
+        with open(personas_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        personas = data.get("personas") if isinstance(data, dict) else data
+        if not isinstance(personas, list) or not personas:
+            raise ValueError(f"{personas_file} must hold a non-empty list of personas")
+        for position, persona_data in enumerate(personas):
+            if not isinstance(persona_data, dict) or any(key not in persona_data for key in REQUIRED_PERSONA_KEYS):
+                raise ValueError(f"Persona {position} in {personas_file} must contain {', '.join(REQUIRED_PERSONA_KEYS)}")
+        return personas
+    
     def get_pdf_files(self) -> List[str]:
+        # Sorted so results merge in the same order whatever the worker count
         pdf_pattern = os.path.join(self.input_dir, "*.pdf")
-        return glob.glob(pdf_pattern)
+        return sorted(glob.glob(pdf_pattern))
     
-    def process_single_pdf(self, pdf_path: str) -> Dict[str, Any]:
+    def process_single_pdf(self, pdf_path: str, rank: bool = False, shards: List[List[Tuple]] = None) -> Dict[str, Any]:
         print(f"Processing: {os.path.basename(pdf_path)}")
         
-        outline_data = extract_outline_from_pdf(pdf_path)
-        content_data = extract_content_from_pdf_with_outline(pdf_path, outline_data)
-        ranked_sections, sub_section_analysis = rank_content_for_persona(
-            content_data, self.persona_data
-        )
-        
-        return {
-            "outline": outline_data,
-            "content": content_data,
-            "ranked_sections": ranked_sections,
-            "sub_section_analysis": sub_section_analysis
-        }
+        # Pages stream through heading detection and section assembly; legacy
+        # scores need no corpus statistics, so sections are scored in the same pass
+        ranker = RelevanceRanker(self.persona_data, self.scoring) if rank and self.scoring == "legacy" else None
+        outline_data = self.outlines.lookup(pdf_path) if self.outlines else None
+        if outline_data is not None:
+            instrumentation.count(os.path.basename(pdf_path), precomputed_outline=1)
+        result = stream_document(pdf_path, ranker, self.blocklist_path, shards, outline_data)
+        if rank and ranker is None:
+            self.rank_document(result)
+        return result
     
-    def process_all_pdfs(self) -> List[Dict[str, Any]]:
-        pdf_files = self.get_pdf_files()
-        results = []
+    def rank_document(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        document = os.path.basename(result.get("pdf_path", "")) or None
+        with instrumentation.stage("rank_sections", document):
+            ranked_sections, sub_section_analysis = rank_content_for_persona(
+                result["content"], self.persona_data, self.scoring
+            )
+        instrumentation.count(document, ranked_sections=len(ranked_sections))
+        result["ranked_sections"] = ranked_sections
+        result["sub_section_analysis"] = sub_section_analysis
+        return result
+    
+    def rank_results(self, results: List[Dict[str, Any]], persona_data: Dict[str, Any] = None,
+                     index: SectionIndex = None, duplicates: NearDuplicateIndex = None) -> List[Dict[str, Any]]:
+        # Ranking runs over all documents at once so BM25 sees corpus-wide statistics
+        with instrumentation.stage("rank_sections"):
+            ranked = rank_corpus_for_persona(
+                [result["content"] for result in results], persona_data or self.persona_data, self.scoring, index, duplicates
+            )
+        for result, (ranked_sections, sub_section_analysis) in zip(results, ranked):
+            instrumentation.count(result["pdf_name"], ranked_sections=len(ranked_sections))
+            result["ranked_sections"] = ranked_sections
+            result["sub_section_analysis"] = sub_section_analysis
+        return results
+    
+    def rank_results_for_personas(self, results: List[Dict[str, Any]], personas: List[Dict[str, Any]],
+                                  index: SectionIndex = None, duplicates: NearDuplicateIndex = None) -> List[ResultAggregator]:
+        # One aggregator per persona; the documents are indexed once and scored
+        # against all personas together
+        with instrumentation.stage("rank_sections"):
+            ranked = rank_corpus_for_personas([result["content"] for result in results], personas, self.scoring,
+                                              index, duplicates)
+        aggregators = []
+        for persona_ranked in ranked:
+            aggregator = self.create_aggregator()
+            for i, (result, (ranked_sections, sub_section_analysis)) in enumerate(zip(results, persona_ranked)):
+                aggregator.add({
+                    "pdf_name": result["pdf_name"],
+                    "content": result["content"],
+                    "ranked_sections": ranked_sections,
+                    "sub_section_analysis": sub_section_analysis
+                }, i)
+            aggregators.append(aggregator)
+        return aggregators
+    
+    def iter_pdfs(self, pdf_files: List[str], rank: bool = False) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # (input position, result) pairs as documents finish; a failing PDF only loses its own result
+        if self.store is None:
+            yield from self._iter_parsed_pdfs(pdf_files, rank)
+            return
+        
+        stale = []
+        for i, pdf_path in enumerate(pdf_files):
+            with instrumentation.stage("load_stored_document", os.path.basename(pdf_path)):
+                cached = self.store.load(pdf_path)
+            if cached is None:
+                stale.append(i)
+                continue
+            result = {"pdf_path": pdf_path, "pdf_name": os.path.basename(pdf_path), **cached}
+            yield i, self.rank_document(result) if rank else result
         
+        print(f"Reusing {len(pdf_files) - len(stale)} stored documents, processing {len(stale)}")
+        for j, result in self._iter_parsed_pdfs([pdf_files[i] for i in stale], rank):
+            self.store.save(result["pdf_path"], result)
+            yield stale[j], result
+        self.store.flush()
+    
+    def plan_shards(self, pdf_files: List[str]) -> List[List[Tuple[int, int]]]:
+        # Page ranges per PDF; PDFs over shard_pages pages get one range per worker
+        if self.max_workers < 2 or not self.shard_pages:
+            return [[(0, None)] for _ in pdf_files]
+        plan = []
         for pdf_path in pdf_files:
             try:
-                result = self.process_single_pdf(pdf_path)
-                results.append({
-                    "pdf_path": pdf_path,
-                    "pdf_name": os.path.basename(pdf_path),
-                    **result
-                })
+                plan.append(shard_ranges(page_count(pdf_path), self.shard_pages, self.max_workers))
+            except Exception:
+                # Left to process_single_pdf to report
+                plan.append([(0, None)])
+        return plan
+    
+    def _iter_parsed_pdfs(self, pdf_files: List[str], rank: bool) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if self.max_workers > 1 and pdf_files:
+            plan = self.plan_shards(pdf_files)
+            if sum(len(ranges) for ranges in plan) > 1:
+                yield from self._iter_pdfs_parallel(pdf_files, rank, plan)
+                return
+        
+        for i, pdf_path in enumerate(pdf_files):
+            try:
+                yield i, process_pdf_task(self, pdf_path, rank)
             except Exception as e:
                 print(f"Error processing {pdf_path}: {e}")
                 continue
-        
-        return results
     
-    def generate_final_output(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        all_ranked_sections = []
-        all_sub_section_analysis = []
+    def _iter_pdfs_parallel(self, pdf_files: List[str], rank: bool,
+                            plan: List[List[Tuple[int, int]]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # One task per document, or per page range of a sharded document, which
+        # is assembled here once all its shards are in. Yielded in completion order.
+        workers = min(self.max_workers, sum(len(ranges) for ranges in plan))
+        shards = {}
         
-        for result in results:
-            all_ranked_sections.extend(result["ranked_sections"])
-            all_sub_section_analysis.extend(result["sub_section_analysis"])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for i, (pdf_path, ranges) in enumerate(zip(pdf_files, plan)):
+                if len(ranges) == 1:
+                    futures[executor.submit(process_pdf_task, self, pdf_path, rank)] = (i, None)
+                    continue
+                print(f"Sharding {os.path.basename(pdf_path)} into {len(ranges)} page ranges")
+                shards[i] = [None] * len(ranges)
+                for k, (start, stop) in enumerate(ranges):
+                    futures[executor.submit(read_shard_task, pdf_path, start, stop, self.blocklist_path)] = (i, k)
+            
+            for future in as_completed(futures):
+                i, k = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # A sharded document is reported once, at its first failed shard
+                    if k is None or shards.pop(i, None) is not None:
+                        print(f"Error processing {pdf_files[i]}: {e}")
+                    continue
+                if k is not None:
+                    if i not in shards:
+                        continue
+                    shards[i][k] = result
+                    if any(shard is None for shard in shards[i]):
+                        continue
+                    try:
+                        result = process_pdf_task(self, pdf_files[i], rank, shards.pop(i))
+                    except Exception as e:
+                        print(f"Error processing {pdf_files[i]}: {e}")
+                        continue
+                yield i, result
+    
+    def process_pdfs(self, pdf_files: List[str], rank: bool = False) -> List[Dict[str, Any]]:
+        # Collected by input position, not completion order
+        slots = [None] * len(pdf_files)
+        for i, result in self.iter_pdfs(pdf_files, rank):
+            slots[i] = result
+        return [result for result in slots if result is not None]
+    
+    def process_all_pdfs(self) -> List[Dict[str, Any]]:
+        # Legacy scores are per document, so workers rank too; BM25 needs
+        # corpus-wide statistics and ranks once all documents are merged
+        per_document = self.scoring == "legacy"
+        pdf_files = self.get_pdf_files()
+        results = self.process_pdfs(pdf_files, rank=per_document)
+        self.prune_store(pdf_files)
+        return results if per_document else self.rank_results(results)
+    
+    def prune_store(self, pdf_files: List[str]) -> None:
+        # Only after a run over the whole input directory
+        if self.store is not None:
+            self.store.prune(pdf_files)
+            self.store.flush()
+    
+    def create_aggregator(self) -> ResultAggregator:
+        return ResultAggregator(include_content=self.include_content)
+    
+    def aggregate_all_pdfs(self) -> ResultAggregator:
+        # Streams every document into a top-K aggregator and drops it right away.
+        # With legacy scoring this happens as each document finishes; BM25 has to
+        # index the whole corpus first, then releases documents one by one.
+        aggregator = self.create_aggregator()
+        pdf_files = self.get_pdf_files()
         
-        all_ranked_sections.sort(key=lambda x: x["importance_rank"], reverse=True)
-        all_sub_section_analysis.sort(key=lambda x: x["importance_rank"], reverse=True)
+        if self.scoring == "legacy":
+            for i, result in self.iter_pdfs(pdf_files, rank=True):
+                aggregator.add(result, i)
+            self.prune_store(pdf_files)
+            return aggregator
         
-        input_documents = [os.path.basename(result["pdf_path"]) for result in results]
+        results = self.process_pdfs(pdf_files)
+        self.prune_store(pdf_files)
+        results = self.rank_results(results)
+        for i in range(len(results)):
+            aggregator.add(results[i], i)
+            results[i] = None
+        return aggregator
+    
+    def generate_final_output(self, results: List[Dict[str, Any]], persona_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        aggregator = self.create_aggregator()
+        for i, result in enumerate(results):
+            aggregator.add(result, i)
+        return self.build_final_output(aggregator, persona_data)
+    
+    def build_final_output(self, aggregator: ResultAggregator, persona_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        persona_data = persona_data or self.persona_data
         
         final_output = {
             "metadata": {
-                "input_documents": input_documents,
-                "persona": self.persona_data["persona"],
-                "job_to_be_done": self.persona_data["job_to_be_done"],
+                "input_documents": aggregator.input_documents,
+                "persona": persona_data["persona"],
+                "job_to_be_done": persona_data["job_to_be_done"],
                 "processing_timestamp": datetime.datetime.now().isoformat(),
-                "total_documents_processed": len(results),
-                "total_sections_found": len(all_ranked_sections),
-                "total_sub_sections_analyzed": len(all_sub_section_analysis)
+                "total_documents_processed": aggregator.document_count,
+                "total_sections_found": aggregator.sections.total,
+                "total_sub_sections_analyzed": aggregator.sub_sections.total
             },
-            "extracted_sections": all_ranked_sections[:50],
-            "sub_section_analysis": all_sub_section_analysis[:30]
+            "extracted_sections": aggregator.sections.items(),
+            "sub_section_analysis": aggregator.sub_sections.items()
         }
         
         return final_output
@@ -109,7 +318,7 @@ class Round1BSolution:
         os.makedirs(self.output_dir, exist_ok=True)
         output_path = os.path.join(self.output_dir, filename)
         
-        with open(output_path, "w", encoding="utf-8") as f:
+        with instrumentation.stage("json_dump"), open(output_path, "w", encoding="utf-8") as f:
             json.dump(output_data, f, indent=2, ensure_ascii=False)
         
         print(f"Output saved to: {output_path}")
@@ -124,10 +333,10 @@ class Round1BSolution:
         print(f"Persona: {persona_data['persona']}")
         print(f"Job: {persona_data['job_to_be_done']}")
         
-        results = self.process_all_pdfs()
-        print(f"Processed {len(results)} PDFs")
+        aggregator = self.aggregate_all_pdfs()
+        print(f"Processed {aggregator.document_count} PDFs")
         
-        final_output = self.generate_final_output(results)
+        final_output = self.build_final_output(aggregator)
         output_path = self.save_output(final_output)
         
         print("=== Processing Complete ===")
@@ -135,10 +344,89 @@ class Round1BSolution:
         print(f"Total sub-sections analyzed: {len(final_output['sub_section_analysis'])}")
         
         return output_path
+    
+    def run_batch(self, personas_file: str) -> List[str]:
+        print("=== Round 1B: Persona-Driven Document Intelligence (batch) ===")
+        print(f"Input directory: {self.input_dir}")
+        print(f"Output directory: {self.output_dir}")
+        
+        personas = self.load_personas(personas_file)
+        print(f"Personas: {len(personas)}")
+        
+        pdf_files = self.get_pdf_files()
+        results = self.process_pdfs(pdf_files)
+        self.prune_store(pdf_files)
+        print(f"Processed {len(results)} PDFs")
+        
+        output_paths = []
+        aggregators = self.rank_results_for_personas(results, personas)
+        for position, (persona_data, aggregator) in enumerate(zip(personas, aggregators)):
+            final_output = self.build_final_output(aggregator, persona_data)
+            output_paths.append(self.save_output(final_output, persona_output_name(position, persona_data)))
+        
+        print("=== Processing Complete ===")
+        return output_paths
+
+def persona_output_name(position: int, persona_data: Dict[str, Any]) -> str:
+    # round1b_output_<id>.json, or round1b_output_<NN>_<persona>.json without an "id"
+    name = str(persona_data.get("id") or f"{position + 1:02d}_{persona_data['persona']}")
+    slug = re.sub(r"[^\w-]+", "_", name).strip("_")[:64]
+    return f"round1b_output_{slug}.json"
+
+@instrumentation.work_unit
+def process_pdf_task(solution: Round1BSolution, pdf_path: str, rank: bool, shards: List[List[Tuple]] = None) -> Dict[str, Any]:
+    return {
+        "pdf_path": pdf_path,
+        "pdf_name": os.path.basename(pdf_path),
+        **solution.process_single_pdf(pdf_path, rank, shards)
+    }
+
+@instrumentation.work_unit
+def read_shard_task(pdf_path: str, start: int, stop: int, blocklist_path: str = None) -> List[Tuple]:
+    return read_shard(pdf_path, start, stop, blocklist_path)
 
 def main():
-    solution = Round1BSolution()
-    solution.run()
+    parser = argparse.ArgumentParser(description="Round 1B: Persona-Driven Document Intelligence")
+    parser.add_argument("--input-dir", default="input")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("ROUND1B_WORKERS", "1")),
+                        help="PDFs processed in parallel (0 = one per CPU)")
+    parser.add_argument("--shard-pages", type=int, default=SHARD_PAGES,
+                        help="with --workers above 1, split PDFs longer than this many pages "
+                        "into page ranges read in parallel (0 = never; also ROUND1B_SHARD_PAGES)")
+    parser.add_argument("--scoring", choices=SCORING_MODES, default="bm25")
+    parser.add_argument("--include-content", action="store_true",
+                        help="keep each extracted section's full text in the output")
+    parser.add_argument("--incremental", action="store_true", default=os.environ.get("INCREMENTAL", "0") == "1",
+                        help="reuse stored results for unchanged PDFs (also INCREMENTAL=1); PIPELINE_VERSION "
+                        "covers settings, not code, so leave it off after changing extraction code")
+    parser.add_argument("--personas", help="JSON list of persona/job specs; PDFs are parsed once and "
+                        "one round1b_output_<id>.json is written per persona")
+    parser.add_argument("--outline-dir", default=os.environ.get("ROUND1B_OUTLINE_DIR"),
+                        help="Challenge_1A output directory; PDFs whose content hash matches an outline "
+                        "there skip heading detection (also ROUND1B_OUTLINE_DIR)")
+    parser.add_argument("--blocklist", default=BLOCKLIST_PATH,
+                        help='JSON {"publishers": [...], "authors": [...]} of lines that are never '
+                        "headings, replacing the built-in lists (also ROUND1B_BLOCKLIST)")
+    parser.add_argument("--cache-dir", help=f"stored per-document results (default: {CACHE_DIR}; also ROUND1B_CACHE_DIR)")
+    parser.add_argument("--no-dedup", action="store_true", default=not near_duplicates.ENABLED,
+                        help="rank near-duplicate sections separately instead of collapsing them (also ROUND1B_DEDUP=0)")
+    parser.add_argument("--metrics", action="store_true", default=instrumentation.ENABLED,
+                        help=f"record per-stage wall/CPU time and peak/current RSS to <output-dir>/{instrumentation.METRICS_FILE}")
+    parser.add_argument("--trace", action="store_true", default=instrumentation.TRACE,
+                        help=f"with --metrics, also write a Chrome trace to <output-dir>/{instrumentation.TRACE_FILE}")
+    args = parser.parse_args()
+    
+    near_duplicates.configure(not args.no_dedup)
+    instrumentation.configure(args.metrics, args.trace)
+    instrumentation.start()
+    solution = Round1BSolution(args.input_dir, args.output_dir, args.scoring, args.workers, args.include_content,
+                               args.incremental, args.cache_dir, args.shard_pages, args.outline_dir, args.blocklist)
+    if args.personas:
+        solution.run_batch(args.personas)
+    else:
+        solution.run()
+    instrumentation.write_report(args.output_dir, print)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
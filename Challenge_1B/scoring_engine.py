@@ -0,0 +1,199 @@
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from content_extractor import section_content
+
+TOKEN_RE = re.compile(r"\w+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A query term in the heading counts this much more than one in the body
+HEADING_BOOST = 2.0
+# Same text-quality term as the legacy score, so well-formed sections without
+# query hits still rank (below any section with hits of similar quality)
+QUALITY_WEIGHT = 2.0
+MIN_SECTION_CHARS = 50
+# Rows per dense block when scoring; a block holds ROW_BLOCK x (active query terms) floats
+ROW_BLOCK = 16384
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+class TermMatrix:
+    # Sparse rows of term counts in CSR form. finalize() turns every stored
+    # count into its query-independent BM25 weight, so scoring a query is one
+    # gather plus one bincount over the non-zeros.
+    def __init__(self):
+        self._indptr = [0]
+        self._indices = []
+        self._counts = []
+        self._lengths = []
+
+    def add_row(self, counts: Counter) -> None:
+        self._indices.extend(counts.keys())
+        self._counts.extend(counts.values())
+        self._indptr.append(len(self._indices))
+        self._lengths.append(sum(counts.values()))
+
+    def finalize(self, vocab_size: int) -> None:
+        self.n_rows = len(self._lengths)
+        self.indptr = np.asarray(self._indptr, dtype=np.int64)
+        self.indices = np.asarray(self._indices, dtype=np.int64)
+        tf = np.asarray(self._counts, dtype=np.float64)
+        lengths = np.asarray(self._lengths, dtype=np.float64)
+        self._indptr = self._indices = self._counts = self._lengths = None
+
+        self.row_ids = np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+        df = np.bincount(self.indices, minlength=vocab_size).astype(np.float64)
+        self.idf = np.log1p((self.n_rows - df + 0.5) / (df + 0.5))
+        self.avgdl = float(lengths.mean()) if self.n_rows and lengths.sum() else 1.0
+
+        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[self.row_ids] / self.avgdl)
+        self.weights = self.idf[self.indices] * tf * (BM25_K1 + 1) / norm
+
+    def score(self, query: np.ndarray) -> np.ndarray:
+        return self.score_many(query[None, :])[0]
+
+    def score_many(self, queries: np.ndarray) -> np.ndarray:
+        # (queries x rows) scores as dense matrix products. Only terms some query
+        # uses become columns, so each block of rows is a small dense
+        # (rows x active terms) matrix; ROW_BLOCK bounds its memory.
+        n_queries = queries.shape[0]
+        scores = np.zeros((n_queries, self.n_rows))
+        active = np.flatnonzero(queries.any(axis=0))
+        if not len(active) or not self.n_rows:
+            return scores
+
+        columns = np.full(queries.shape[1], -1, dtype=np.int64)
+        columns[active] = np.arange(len(active))
+        entry_columns = columns[self.indices]
+        selected = np.flatnonzero(entry_columns >= 0)
+        rows = self.row_ids[selected]
+        cols = entry_columns[selected]
+        weights = self.weights[selected]
+        active_queries = queries[:, active]
+
+        # Non-zeros are in row order, so each block's entries are one contiguous run
+        bounds = np.searchsorted(rows, np.arange(0, self.n_rows + ROW_BLOCK, ROW_BLOCK))
+        for block, start in enumerate(range(0, self.n_rows, ROW_BLOCK)):
+            stop = min(start + ROW_BLOCK, self.n_rows)
+            lo, hi = bounds[block], bounds[block + 1]
+            dense = np.zeros((stop - start, len(active)))
+            dense[rows[lo:hi] - start, cols[lo:hi]] = weights[lo:hi]
+            scores[:, start:stop] = active_queries @ dense.T
+        return scores
+
+    def score_rows(self, row_ids: np.ndarray, term_ids: np.ndarray, tfs: np.ndarray, lengths: np.ndarray,
+                   query: np.ndarray) -> np.ndarray:
+        # Scores rows that are not in the matrix against the matrix's statistics,
+        # given as (row, term, count) triples of their query terms plus row lengths
+        norm_len = 1 - BM25_B + BM25_B * lengths / self.avgdl
+        weights = query[term_ids] * self.idf[term_ids] * tfs * (BM25_K1 + 1) / (tfs + BM25_K1 * norm_len[row_ids])
+        return np.bincount(row_ids, weights=weights, minlength=len(lengths))
+
+class SectionIndex:
+    # All sections of all documents, tokenized once into a content and a
+    # heading term matrix over one shared vocabulary.
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self.content = TermMatrix()
+        self.headings = TermMatrix()
+        self.quality: List[float] = []
+        self.sections: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        # NearDuplicateIndex filled while indexing; its duplicate sections are left out
+        self.duplicates: Any = None
+        # text -> (indexed length, term-id counts) of texts scored by score_texts
+        self._text_terms: Dict[str, Tuple[int, Counter]] = {}
+        self.finalized = False
+
+    def _term_counts(self, tokens: List[str]) -> Counter:
+        # Count tokens first, then look up one id per distinct token
+        vocab = self.vocab
+        counts = Counter()
+        for token, tf in Counter(tokens).items():
+            term_id = vocab.get(token)
+            if term_id is None:
+                term_id = vocab[token] = len(vocab)
+            counts[term_id] = tf
+        return counts
+
+    def add_document(self, content_data: Dict[str, Any], quality_fn: Callable[[str], float]) -> None:
+        for section in content_data.get("content", []):
+            content = section_content(content_data, section)
+            if not content or len(content.strip()) < MIN_SECTION_CHARS:
+                continue
+            # The same tokens feed the term counts and the MinHash shingles
+            tokens = tokenize(content)
+            if self.duplicates is not None and self.duplicates.add(content_data, section, content, tokens):
+                continue
+            self.content.add_row(self._term_counts(tokens))
+            self.headings.add_row(self._term_counts(tokenize(section.get("heading", ""))))
+            self.quality.append(quality_fn(content))
+            self.sections.append((content_data, section))
+
+    def finalize(self) -> "SectionIndex":
+        vocab_size = len(self.vocab)
+        self.content.finalize(vocab_size)
+        self.headings.finalize(vocab_size)
+        self.quality = np.asarray(self.quality, dtype=np.float64)
+        self.finalized = True
+        return self
+
+    def query_vector(self, keywords: Iterable[str]) -> np.ndarray:
+        query = np.zeros(len(self.vocab), dtype=np.float64)
+        for keyword in keywords:
+            for token in tokenize(keyword):
+                term_id = self.vocab.get(token)
+                if term_id is not None:
+                    query[term_id] = 1.0
+        return query
+
+    def score(self, query: np.ndarray, heading_boost: float = HEADING_BOOST) -> np.ndarray:
+        if not self.sections:
+            return np.zeros(0)
+        return self.content.score(query) + heading_boost * self.headings.score(query) + QUALITY_WEIGHT * self.quality
+
+    def score_many(self, queries: np.ndarray, heading_boost: float = HEADING_BOOST) -> np.ndarray:
+        # (queries x sections) score matrix for a batch of query vectors
+        if not self.sections:
+            return np.zeros((queries.shape[0], 0))
+        return self.content.score_many(queries) + heading_boost * self.headings.score_many(queries) + QUALITY_WEIGHT * self.quality
+
+    def text_terms(self, text: str) -> Tuple[int, Counter]:
+        # Indexed length and term-id counts of a text outside the index. Kept
+        # for the index's lifetime, so personas ranking the same sub-sections
+        # tokenize each of them once.
+        terms = self._text_terms.get(text)
+        if terms is None:
+            vocab = self.vocab
+            counts = Counter(vocab[token] for token in tokenize(text) if token in vocab)
+            terms = self._text_terms[text] = (sum(counts.values()), counts)
+        return terms
+
+    def score_texts(self, texts: List[str], query: np.ndarray) -> np.ndarray:
+        # Texts outside the index (sub-sections) scored as one batch; only
+        # query terms are counted, lengths count every indexed token
+        if not self.sections or not texts:
+            return np.zeros(len(texts))
+        query_terms = set(np.flatnonzero(query).tolist())
+        lengths, row_ids, term_ids, tfs = [], [], [], []
+        for row, text in enumerate(texts):
+            length, counts = self.text_terms(text)
+            lengths.append(length)
+            for term_id, tf in counts.items():
+                if term_id in query_terms:
+                    row_ids.append(row)
+                    term_ids.append(term_id)
+                    tfs.append(tf)
+        return self.content.score_rows(np.asarray(row_ids, dtype=np.int64), np.asarray(term_ids, dtype=np.int64),
+                                       np.asarray(tfs, dtype=np.float64), np.asarray(lengths, dtype=np.float64), query)
+
+def build_index(content_datas: Iterable[Dict[str, Any]], quality_fn: Callable[[str], float],
+                duplicates: Optional[Any] = None) -> SectionIndex:
+    index = SectionIndex()
+    index.duplicates = duplicates
+    for content_data in content_datas:
+        index.add_document(content_data, quality_fn)
+    return index.finalize()
@@ -0,0 +1,46 @@
+import fitz
+import pytest
+
+from document_pipeline import read_shard, shard_ranges, stream_document
+
+def test_short_documents_are_not_sharded():
+    assert shard_ranges(100, 500, 4) == [(0, 100)]
+    assert shard_ranges(1000, 0, 4) == [(0, 1000)]
+    assert shard_ranges(1000, 500, 1) == [(0, 1000)]
+
+def test_shards_cover_every_page_once():
+    for pages, shard_pages, workers in [(1001, 500, 4), (2000, 500, 4), (2001, 500, 4), (10, 3, 8)]:
+        ranges = shard_ranges(pages, shard_pages, workers)
+        assert ranges[0][0] == 0 and ranges[-1][1] == pages
+        assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+        sizes = [stop - start for start, stop in ranges]
+        assert len(ranges) <= workers and max(sizes) - min(sizes) <= 1
+
+def test_shard_count_follows_shard_pages():
+    assert shard_ranges(1001, 500, 8) == [(0, 333), (333, 667), (667, 1001)]
+
+CHAPTERS = ["Introduction", "Background", "Methods", "Results", "Discussion", "Conclusion"]
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    for i, chapter in enumerate(CHAPTERS):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{i + 1}. {chapter}", fontsize=16)
+        # Long enough to pass the section quality filter
+        page.insert_text((72, 110), f"This chapter covers the {chapter.lower()} of the study in detail.")
+        page.insert_text((72, 130), "It adds enough further words to count as one full section of text.")
+    doc.save(path)
+    return path
+
+def test_sharded_read_matches_unsharded(pdf_path):
+    shards = [read_shard(pdf_path, start, stop) for start, stop in shard_ranges(6, 2, 3)]
+    assert [page for shard in shards for page, _, _ in shard] == list(range(6))
+    sharded, unsharded = stream_document(pdf_path, shards=shards), stream_document(pdf_path)
+    assert [heading["text"] for heading in unsharded["outline"]["outline"]] == [
+        f"{i + 1}. {chapter}" for i, chapter in enumerate(CHAPTERS)]
+    assert sharded["outline"] == unsharded["outline"]
+    sections = [(section["heading"], section["start"], section["end"]) for section in unsharded["content"]["content"]]
+    assert len(sections) == len(CHAPTERS)
+    assert [(section["heading"], section["start"], section["end"]) for section in sharded["content"]["content"]] == sections
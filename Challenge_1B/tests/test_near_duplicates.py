@@ -0,0 +1,45 @@
+import random
+
+from near_duplicates import NearDuplicateIndex, duplicate_links, find_near_duplicates
+
+rng = random.Random(3)
+WORDS = [f"term{i}" for i in range(500)]
+
+def paragraph(words=120):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def document(title, texts):
+    return {"title": title, "content": [{"heading": f"{title} {i}", "page": i + 1, "content": text}
+                                        for i, text in enumerate(texts)]}
+
+def test_copy_and_light_edit_are_duplicates():
+    text = paragraph()
+    words = text.split()
+    edited = " ".join(words[:-1] + ["changed"])
+    first, copy, near = document("a", [text]), document("b", [text]), document("c", [edited])
+
+    index = NearDuplicateIndex()
+    assert not index.add(first, first["content"][0], text)
+    assert index.add(copy, copy["content"][0], text)
+    assert index.add(near, near["content"][0], edited)
+    assert index.duplicate_count == 2
+    assert index.is_duplicate(copy["content"][0]) and not index.is_duplicate(first["content"][0])
+    assert [link["document"] for link in duplicate_links(index, first["content"][0])] == ["b", "c"]
+
+def test_distinct_sections_are_kept():
+    doc = document("a", [paragraph() for _ in range(20)])
+    index = find_near_duplicates([doc])
+    assert index.duplicate_count == 0
+    assert all(duplicate_links(index, section) == [] for section in doc["content"])
+
+def test_short_sections_are_not_fingerprinted():
+    doc = document("a", ["Too short to rank.", "Too short to rank."])
+    index = NearDuplicateIndex()
+    assert not any(index.add(doc, section, section["content"]) for section in doc["content"])
+
+def test_first_copy_in_input_order_is_kept():
+    text = paragraph()
+    docs = [document("a", [paragraph(), text]), document("b", [text])]
+    index = find_near_duplicates(docs)
+    assert not index.is_duplicate(docs[0]["content"][1])
+    assert index.is_duplicate(docs[1]["content"][0])
@@ -0,0 +1,30 @@
+from outline_extractor import TOC_GAP_PAGES, bookmark_outline
+
+def toc(pages, level=1):
+    return [[level, f"Chapter {page}", page] for page in pages]
+
+def test_gap_ranges_cover_unbookmarked_runs():
+    # 1-based bookmark pages; gap ranges are 0-based [start, stop)
+    outline = bookmark_outline(toc([15, 16, 17, 40]), 60)
+    assert outline.gap_ranges == [(0, 14), (17, 39), (40, 60)]
+    assert outline.needs_scan(0) and outline.needs_scan(13) and not outline.needs_scan(14)
+    assert not outline.needs_scan(16) and outline.needs_scan(17) and outline.needs_scan(38)
+    assert not outline.needs_scan(39) and outline.needs_scan(59)
+
+def test_runs_up_to_gap_limit_are_not_scanned():
+    last = 3 + TOC_GAP_PAGES
+    outline = bookmark_outline(toc([1, 2, 3]), last)
+    assert outline.gap_ranges == []
+    assert bookmark_outline(toc([1, 2, 3]), last + 1).gap_ranges == [(3, last + 1)]
+
+def test_sparse_or_broken_bookmarks_are_ignored():
+    assert bookmark_outline([], 10) is None
+    assert bookmark_outline(toc([1, 2]), 10) is None
+    # Entries pointing outside the document or without a title do not count
+    assert bookmark_outline(toc([1, 2, 0, 11]) + [[1, "  ", 3]], 10) is None
+
+def test_headings_by_page_with_levels_clamped():
+    outline = bookmark_outline([[1, "Intro", 1], [2, "Scope", 1], [5, "Deep  detail", 2]], 2)
+    assert outline.page_headings(0) == [{"level": "H1", "text": "Intro", "page": 1},
+                                        {"level": "H2", "text": "Scope", "page": 1}]
+    assert outline.page_headings(1) == [{"level": "H3", "text": "Deep detail", "page": 2}]
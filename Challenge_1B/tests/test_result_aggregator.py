@@ -0,0 +1,37 @@
+import itertools
+
+from result_aggregator import ResultAggregator, TopK
+
+def ranked(document, scores):
+    return [{"document": document, "section_title": f"{document}-{i}", "importance_rank": score}
+            for i, score in enumerate(scores)]
+
+def test_ties_go_to_earlier_documents_and_positions():
+    top = TopK(3)
+    for order, position, score in [(1, 0, 5.0), (0, 1, 5.0), (0, 0, 5.0), (1, 1, 5.0), (0, 2, 1.0)]:
+        if top.accepts(score, (order, position)):
+            top.push(score, (order, position), {"key": (order, position)})
+    assert [item["key"] for item in top.items()] == [(0, 0), (0, 1), (1, 0)]
+
+def test_merge_does_not_depend_on_arrival_order():
+    # What a stable descending sort over the documents in input order gives
+    results = [
+        {"pdf_name": "a.pdf", "ranked_sections": ranked("a", [3.0, 2.0, 2.0])},
+        {"pdf_name": "b.pdf", "ranked_sections": ranked("b", [3.0, 2.0])},
+        {"pdf_name": "c.pdf", "ranked_sections": ranked("c", [2.0, 1.0])}
+    ]
+    merged = [section for result in results for section in result["ranked_sections"]]
+    expected = [section["section_title"] for section in sorted(merged, key=lambda s: s["importance_rank"], reverse=True)][:4]
+
+    for arrival in itertools.permutations(range(len(results))):
+        aggregator = ResultAggregator(section_limit=4)
+        for order in arrival:
+            aggregator.add(results[order], order)
+        assert [section["section_title"] for section in aggregator.sections.items()] == expected
+        assert aggregator.input_documents == ["a.pdf", "b.pdf", "c.pdf"]
+        assert aggregator.sections.total == 7
+
+def test_zero_limit_keeps_nothing():
+    top = TopK(0)
+    assert not top.accepts(1.0, (0, 0))
+    assert top.items() == []
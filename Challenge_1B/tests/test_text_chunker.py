@@ -0,0 +1,43 @@
+from text_chunker import iter_chunks, iter_sentence_spans
+
+def sentences(count, length=40):
+    # Distinct sentences of exactly `length` characters, separated by one space
+    return [f"Sentence {i:02d} " + "x" * (length - 13) + "." for i in range(count)]
+
+def test_windows_hold_whole_sentences_within_max_length():
+    parts = sentences(12)
+    text = " ".join(parts)
+    chunks = list(iter_chunks(text, max_length=130, overlap=45, min_length=1))
+    assert chunks
+    for chunk in chunks:
+        assert len(chunk) <= 130
+        assert chunk.startswith("Sentence") and chunk.endswith(".")
+    # Every sentence lands in some window
+    assert all(any(part in chunk for chunk in chunks) for part in parts)
+
+def test_windows_overlap_by_trailing_sentences():
+    text = " ".join(sentences(12))
+    chunks = list(iter_chunks(text, max_length=130, overlap=45, min_length=1))
+    # Three 40-char sentences fit in 130; the last one (41 with its space) fits in the overlap
+    assert [len(chunk) for chunk in chunks[:2]] == [122, 122]
+    assert chunks[1].startswith(chunks[0][-40:])
+
+def test_sentence_ends_at_decimal_and_cjk_terminators():
+    text = "Growth was 3.5 percent. 第一句。第二句！"
+    assert [text[start:end] for start, end in iter_sentence_spans(text)] == [
+        "Growth was 3.5 percent.", "第一句。", "第二句！"]
+
+def test_overlong_sentence_is_cut_at_a_space():
+    text = " ".join(["word"] * 100)
+    spans = list(iter_sentence_spans(text, max_length=50))
+    assert all(end - start <= 50 for start, end in spans)
+    pieces = [text[start:end] for start, end in spans]
+    # No word is split and none is lost
+    assert all(piece == " ".join(["word"] * (piece.count(" ") + 1)) for piece in pieces)
+    assert sum(piece.count(" ") + 1 for piece in pieces) == 100
+
+def test_short_and_empty_text():
+    assert list(iter_chunks("")) == []
+    assert list(iter_chunks("Too short.", min_length=50)) == []
+    assert list(iter_chunks("Just long enough to be kept as one window.", min_length=10)) == [
+        "Just long enough to be kept as one window."]
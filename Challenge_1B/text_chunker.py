@@ -0,0 +1,59 @@
+import re
+from collections import deque
+from typing import Iterator, Tuple
+
+# A sentence ends at ASCII terminators followed by whitespace (so "3.5" stays
+# whole) or at CJK full-width terminators, which need no space after them
+SENTENCE_END_RE = re.compile(r"[.!?]+(?=\s|$)|[。！？；]+")
+MAX_CHUNK_CHARS = 300
+OVERLAP_CHARS = 100
+MIN_CHUNK_CHARS = 50
+
+def _trimmed_pieces(text: str, start: int, end: int, max_length: int) -> Iterator[Tuple[int, int]]:
+    # text[start:end] without surrounding whitespace, cut into pieces of at most
+    # max_length chars, at the last space of a piece where there is one
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    while end - start > max_length:
+        cut = text.rfind(" ", start + max_length // 2, start + max_length)
+        if cut == -1:
+            cut = start + max_length
+        yield start, cut
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if end > start:
+        yield start, end
+
+def iter_sentence_spans(text: str, max_length: int = MAX_CHUNK_CHARS) -> Iterator[Tuple[int, int]]:
+    # (start, end) offsets of each sentence; sentences over max_length are cut
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        yield from _trimmed_pieces(text, start, match.end(), max_length)
+        start = match.end()
+    yield from _trimmed_pieces(text, start, len(text), max_length)
+
+def iter_chunks(text: str, max_length: int = MAX_CHUNK_CHARS, overlap: int = OVERLAP_CHARS,
+                min_length: int = MIN_CHUNK_CHARS) -> Iterator[str]:
+    # Windows of whole sentences of at most max_length chars. Each window starts
+    # with the previous one's trailing sentences that fit in `overlap` chars, so
+    # a passage cut at a window edge still appears whole in the next one. One
+    # pass: every sentence enters and leaves the window once.
+    if not text:
+        return
+    overlap = min(overlap, max_length // 2)
+    window = deque()
+    for start, end in iter_sentence_spans(text, max_length):
+        if window and end - window[0][0] > max_length:
+            chunk = text[window[0][0]:window[-1][1]]
+            if len(chunk) >= min_length:
+                yield chunk
+            while window and (window[-1][1] - window[0][0] > overlap or end - window[0][0] > max_length):
+                window.popleft()
+        window.append((start, end))
+    if window:
+        chunk = text[window[0][0]:window[-1][1]]
+        if len(chunk) >= min_length:
+            yield chunk
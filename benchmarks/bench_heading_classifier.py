@@ -0,0 +1,110 @@
+"""
+Micro-benchmark: compiled HeadingClassifier vs. the original per-line regex loop.
+
+Usage:
+    python3 benchmarks/bench_heading_classifier.py [--corpus lines.txt] [--input-dir Challenge_1B/input] [--repeat 50]
+
+The line corpus is either a text file (one line per line) or every text line of
+the PDFs in --input-dir. Both classifiers must agree on every line.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Challenge_1B"))
+
+from heading_classifier import (
+    DEFAULT_AUTHOR_INDICATORS,
+    DEFAULT_HEADING_PATTERNS,
+    DEFAULT_PUBLISHER_NAMES,
+    HeadingClassifier,
+)
+
+# Reference copy of the original OutlineExtractor._classify_heading
+def legacy_classify(line, heading_patterns=DEFAULT_HEADING_PATTERNS,
+                    publisher_names=DEFAULT_PUBLISHER_NAMES,
+                    author_indicators=DEFAULT_AUTHOR_INDICATORS):
+    line = line.strip()
+
+    if not line or len(line) < 4:
+        return None
+    text_lower = line.lower().strip()
+    if text_lower in publisher_names:
+        return None
+    for author in author_indicators:
+        if author in text_lower or text_lower in author:
+            return None
+    if len(line) > 150:
+        return None
+    if re.match(r'^\d+$', line):
+        return None
+    if re.match(r'^[A-Z\s]{2,}$', line) and len(line) < 8:
+        return None
+    if re.match(r'^[A-Z][a-z]+\s+[A-Z][a-z]+$', line):
+        return None
+
+    for level, patterns in heading_patterns.items():
+        for pattern in patterns:
+            if re.match(pattern, line):
+                return level.upper()
+    return None
+
+def load_corpus(corpus_path, input_dir):
+    if corpus_path:
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f]
+
+    import fitz
+    lines = []
+    for pdf_path in sorted(glob.glob(os.path.join(input_dir, "*.pdf"))):
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                lines.extend(line.strip() for line in page.get_text().split("\n") if line.strip())
+    return lines
+
+def time_classifier(classify, lines, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            classify(line)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="text file with one candidate line per line")
+    parser.add_argument("--input-dir", default=os.path.join(ROOT, "Challenge_1B", "input"), help="PDF directory used when --corpus is not given")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    lines = load_corpus(args.corpus, args.input_dir)
+    if not lines:
+        print("No lines to benchmark")
+        return 1
+
+    classifier = HeadingClassifier()
+    mismatches = [line for line in lines if legacy_classify(line) != classifier.classify(line)]
+    if mismatches:
+        print(f"{len(mismatches)} lines classified differently, e.g. {mismatches[:5]!r}")
+        return 1
+
+    legacy_time = time_classifier(legacy_classify, lines, args.repeat)
+    compiled_time = time_classifier(classifier.classify, lines, args.repeat)
+    total = len(lines) * args.repeat
+
+    print(json.dumps({
+        "lines": len(lines),
+        "repeat": args.repeat,
+        "legacy_lines_per_sec": round(total / legacy_time),
+        "compiled_lines_per_sec": round(total / compiled_time),
+        "speedup": round(legacy_time / compiled_time, 2)
+    }, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
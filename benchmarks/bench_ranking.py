@@ -0,0 +1,110 @@
+"""
+Ranking benchmark: legacy substring scoring vs. the vectorized BM25 engine.
+
+Usage:
+    python3 benchmarks/bench_ranking.py [--sections 20000] [--words 150] [--seed 7] [--repeat 20] [--no-dedup]
+
+Builds a synthetic corpus of sections and times the legacy substring score
+against BM25, split into the one-off index build (tokenizing every section)
+and scoring a query against the built index. Near-duplicate detection runs
+while the index is built and is reported on its own as dedup_seconds; neither
+bm25_index_seconds nor legacy_seconds include it (legacy reuses the duplicates
+the index found).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Challenge_1B"))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+
+import near_duplicates
+from relevance_ranker import RelevanceRanker
+
+PERSONA = {
+    "persona": "PhD Researcher in Computational Biology",
+    "job_to_be_done": "Prepare a comprehensive literature review focusing on methodologies, datasets, and performance benchmarks",
+    "focus_areas": ["research methodologies", "datasets", "performance benchmarks", "computational biology", "literature review"],
+    "expertise_level": "expert",
+    "domain": "academic_research"
+}
+
+VOCABULARY = (
+    "the of and to in a is that for with as on by this are be from which study analysis data dataset "
+    "database method methodology results model framework protein gene sequence cell experiment benchmark "
+    "performance evaluation review survey literature approach technique algorithm validation biology "
+    "computational network learning training accuracy baseline sample cohort statistical significance"
+).split()
+
+def synthetic_corpus(sections, words, documents, seed):
+    rng = random.Random(seed)
+    per_doc = max(1, sections // documents)
+    corpus = []
+    for d in range(documents):
+        content = []
+        for s in range(per_doc):
+            sentences = []
+            for _ in range(max(1, words // 12)):
+                sentences.append(" ".join(rng.choice(VOCABULARY) for _ in range(12)).capitalize() + ".")
+            content.append({
+                "level": "H1",
+                "heading": " ".join(rng.choice(VOCABULARY) for _ in range(4)).title(),
+                "page": s // 4 + 1,
+                "content": " ".join(sentences)
+            })
+        corpus.append({"title": f"doc{d}", "content": content})
+    return corpus
+
+def time_legacy(corpus, duplicates):
+    ranker = RelevanceRanker(PERSONA, "legacy")
+    start = time.perf_counter()
+    ranked = ranker.rank_documents(corpus, duplicates)
+    return time.perf_counter() - start, sum(len(r) for r in ranked)
+
+def time_bm25(corpus, repeat):
+    # Returns the index too, whose near-duplicates the legacy run reuses
+    ranker = RelevanceRanker(PERSONA, "bm25")
+    start = time.perf_counter()
+    index = ranker.build_index(corpus)
+    build_time = time.perf_counter() - start
+    dedup_time = index.duplicates.seconds if index.duplicates is not None else 0.0
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scores = index.score(index.query_vector(ranker.keywords))
+    query_time = (time.perf_counter() - start) / repeat
+    return build_time - dedup_time, dedup_time, query_time, int((scores > 0.01).sum()), index
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=20, help="BM25 queries to average over")
+    parser.add_argument("--no-dedup", action="store_true", help="skip near-duplicate detection")
+    args = parser.parse_args()
+
+    near_duplicates.configure(not args.no_dedup)
+    corpus = synthetic_corpus(args.sections, args.words, args.documents, args.seed)
+    build_time, dedup_time, query_time, bm25_count, index = time_bm25(corpus, args.repeat)
+    legacy_time, legacy_count = time_legacy(corpus, index.duplicates)
+
+    print(json.dumps({
+        "sections": legacy_count,
+        "bm25_sections": bm25_count,
+        "legacy_seconds": round(legacy_time, 3),
+        "bm25_index_seconds": round(build_time, 3),
+        "dedup_seconds": round(dedup_time, 3),
+        "bm25_query_seconds": round(query_time, 4),
+        "query_speedup": round(legacy_time / query_time, 1)
+    }, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
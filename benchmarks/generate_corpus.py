@@ -0,0 +1,185 @@
+"""
+Deterministic synthetic PDF corpus for the scaling benchmarks.
+
+Usage:
+    python3 benchmarks/generate_corpus.py --out benchmarks/corpus [--pages 10 50] [--scripts latin cjk]
+        [--heading-density 0.3] [--scanned-ratio 0.0 0.5] [--documents 1] [--seed 7]
+
+Writes one PDF per combination of page count, script and scanned ratio, built
+offline with PyMuPDF. The same arguments always produce the same text, layout
+and scanned-page choice. Text pages carry a real text layer; scanned pages are
+the same page rendered to an image, so they have no text layer and need OCR.
+Headings are numbered ("2. ...", "2.1 ...") and set larger and bold.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+import fitz
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 72
+BODY_SIZE = 10
+HEADING_SIZE = 15
+SUB_HEADING_SIZE = 12.5
+LINE_SPACING = 1.45
+SCAN_DPI = 150
+
+LATIN_WORDS = (
+    "the of and to in is that for with as on by this are be from which it an "
+    "analysis data study method results model framework evaluation experiment review "
+    "approach performance sample network learning research system process design "
+    "measurement structure language document information quality development practice"
+).split()
+LATIN_HEADING_WORDS = (
+    "Introduction Background Methods Results Discussion Evaluation Datasets Related Work "
+    "Analysis Design Implementation Conclusion Limitations Overview Experiments Findings"
+).split()
+CJK_WORDS = (
+    "研究 方法 数据 分析 结果 模型 框架 评估 实验 发展 平台 策略 期刊 科技 协同 路径 "
+    "系统 过程 设计 质量 信息 文献 综述 技术 应用 管理 问题 理论 实践 影响 的 和 与 在 对"
+).split()
+CJK_HEADING_WORDS = "引言 背景 研究方法 实验结果 讨论 评估 数据集 相关工作 结论 局限性 概述".split()
+# Built-in PyMuPDF fonts, so generation needs no font files
+FONTS = {
+    "latin": ("helv", "hebo"),
+    "cjk": ("china-s", "china-s")
+}
+
+def latin_sentence(rng):
+    words = [rng.choice(LATIN_WORDS) for _ in range(rng.randint(8, 16))]
+    return " ".join(words).capitalize() + "."
+
+def cjk_sentence(rng):
+    return "".join(rng.choice(CJK_WORDS) for _ in range(rng.randint(12, 24))) + "。"
+
+def heading_text(script, rng, number):
+    if script == "cjk":
+        return f"{number} {rng.choice(CJK_HEADING_WORDS)}"
+    words = [rng.choice(LATIN_HEADING_WORDS)] + [rng.choice(LATIN_HEADING_WORDS).lower() for _ in range(rng.randint(0, 2))]
+    return f"{number} {' '.join(words)}"
+
+def wrap(text, font, fontsize, width, script):
+    # Greedy wrap on words (Latin) or characters (CJK)
+    tokens = list(text) if script == "cjk" else text.split(" ")
+    joiner = "" if script == "cjk" else " "
+    lines, current = [], ""
+    for token in tokens:
+        candidate = current + joiner + token if current else token
+        if current and font.text_length(candidate, fontsize=fontsize) > width:
+            lines.append(current)
+            current = token
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+def page_script(script, page_index):
+    if script == "mixed":
+        return "cjk" if page_index % 2 else "latin"
+    return script
+
+def write_page(page, script, rng, heading_density, numbering):
+    body_name, heading_name = FONTS[script]
+    body_font = fitz.Font(body_name)
+    width = PAGE_WIDTH - 2 * MARGIN
+    y = MARGIN
+    headings = []
+
+    while y < PAGE_HEIGHT - MARGIN - 3 * BODY_SIZE:
+        if rng.random() < heading_density:
+            if numbering[1] == 0 or rng.random() < 0.5:
+                numbering[0] += 1
+                numbering[1] = 1
+                number, size = f"{numbering[0]}.", HEADING_SIZE
+            else:
+                numbering[1] += 1
+                number, size = f"{numbering[0]}.{numbering[1]}", SUB_HEADING_SIZE
+            text = heading_text(script, rng, number)
+            y += size * 0.6
+            page.insert_text((MARGIN, y + size), text, fontname=heading_name, fontsize=size)
+            headings.append(text)
+            y += size * LINE_SPACING + size * 0.4
+
+        sentence = cjk_sentence if script == "cjk" else latin_sentence
+        paragraph = ("" if script == "cjk" else " ").join(sentence(rng) for _ in range(rng.randint(2, 6)))
+        for line in wrap(paragraph, body_font, BODY_SIZE, width, script):
+            if y > PAGE_HEIGHT - MARGIN - BODY_SIZE:
+                break
+            page.insert_text((MARGIN, y + BODY_SIZE), line, fontname=body_name, fontsize=BODY_SIZE)
+            y += BODY_SIZE * LINE_SPACING
+        y += BODY_SIZE * 0.8
+
+    return headings
+
+def rasterize_page(doc, index):
+    # Replace a text page by an image of itself, leaving no text layer
+    pix = doc[index].get_pixmap(dpi=SCAN_DPI)
+    doc.delete_page(index)
+    page = doc.new_page(pno=index, width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_image(page.rect, pixmap=pix)
+
+def build_pdf(path, pages, script="latin", heading_density=0.3, scanned_ratio=0.0, seed=0):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    numbering = [0, 0]
+    headings = 0
+    for index in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        headings += len(write_page(page, page_script(script, index), rng, heading_density, numbering))
+
+    scanned = sorted(rng.sample(range(pages), round(pages * scanned_ratio)))
+    for index in scanned:
+        rasterize_page(doc, index)
+
+    doc.set_metadata({"title": os.path.splitext(os.path.basename(path))[0], "creationDate": "", "modDate": ""})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return {"pages": pages, "script": script, "heading_density": heading_density,
+            "scanned_pages": len(scanned), "headings": headings, "seed": seed}
+
+def document_name(pages, script, scanned_ratio, number):
+    return f"synthetic_{script}_{pages}p_scan{int(round(scanned_ratio * 100))}_{number}.pdf"
+
+def generate_corpus(out_dir, page_counts=(10,), scripts=("latin",), heading_density=0.3,
+                    scanned_ratios=(0.0,), documents=1, seed=7):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for pages in page_counts:
+        for script in scripts:
+            for scanned_ratio in scanned_ratios:
+                for number in range(documents):
+                    name = document_name(pages, script, scanned_ratio, number)
+                    # Seed per document so adding a combination leaves the others unchanged
+                    doc_seed = random.Random(f"{seed}:{pages}:{script}:{scanned_ratio}:{number}").getrandbits(31)
+                    manifest[name] = build_pdf(os.path.join(out_dir, name), pages, script,
+                                               heading_density, scanned_ratio, doc_seed)
+    with open(os.path.join(out_dir, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--scripts", nargs="+", choices=["latin", "cjk", "mixed"], default=["latin", "cjk"])
+    parser.add_argument("--heading-density", type=float, default=0.3,
+                        help="chance that a paragraph is preceded by a heading")
+    parser.add_argument("--scanned-ratio", type=float, nargs="+", default=[0.0],
+                        help="share of pages replaced by images of themselves")
+    parser.add_argument("--documents", type=int, default=1, help="documents per combination")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.out, args.pages, args.scripts, args.heading_density,
+                               args.scanned_ratio, args.documents, args.seed)
+    print(f"Wrote {len(manifest)} PDFs to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
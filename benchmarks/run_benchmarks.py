@@ -0,0 +1,277 @@
+"""
+Stage-level scaling benchmarks for Challenge 1A and Challenge 1B.
+
+Usage:
+    python3 benchmarks/generate_corpus.py --out benchmarks/corpus
+    python3 benchmarks/run_benchmarks.py --corpus benchmarks/corpus [--challenge 1a 1b] [--repeat 3]
+        [--output benchmarks/results/latest.json] [--baseline benchmarks/results/previous.json]
+
+Every PDF in --corpus is run through each challenge's stages separately:
+  1A: probe, text_layer, rasterize, ocr, outline, serialize
+  1B: parse, outline, content (per document, split out of the per-page
+      instrumentation stages of document_pipeline.stream_document); rank,
+      serialize (whole corpus)
+Each stage reports the fastest of --repeat runs. Stages whose external tools
+are missing here (pdftoppm, tesseract) are listed under "skipped" with the
+reason instead of failing the run. The OCR cache is disabled so OCR is measured
+cold. Results are written as JSON; with --baseline, stages that got slower than
+--threshold (and take at least --min-seconds) are reported, and
+--fail-on-regression exits non-zero on any.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Challenge_1A"))
+sys.path.insert(0, os.path.join(ROOT, "Challenge_1B"))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+os.environ["OCR_CACHE_PATH"] = ""
+
+import fitz
+
+# 1B benchmark stage -> instrumentation stage that stream_document records per page
+STREAM_STAGES = {"parse": "parse_pdf", "outline": "extract_outline", "content": "extract_content"}
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+        self.skipped = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def skip(self, name, reason):
+        self.skipped[name] = reason
+
+def fastest(runs):
+    # Per-stage minimum over repeated runs of the same work
+    stages = {}
+    for timer in runs:
+        for name, seconds in timer.stages.items():
+            stages[name] = min(seconds, stages.get(name, seconds))
+    skipped = {}
+    for timer in runs:
+        skipped.update(timer.skipped)
+    return {name: round(seconds, 6) for name, seconds in stages.items()}, skipped
+
+def run_1a(pdf_path):
+    import multilingual_outline_extractor as mx
+
+    timer = StageTimer()
+    with timer.stage("probe"):
+        page_count, lang, title = mx.probe_document(pdf_path)
+    with timer.stage("text_layer"):
+        texts = mx.read_text_layer(pdf_path) or [None] * page_count
+        usable = [mx.has_usable_text(text) for text in texts]
+
+    headings = {}
+    with timer.stage("outline"):
+        for idx, (text, ok) in enumerate(zip(texts, usable)):
+            if ok:
+                headings[idx] = mx.text_layer_page(text, idx)
+
+    ocr_indices = [idx for idx, ok in enumerate(usable) if not ok]
+    if ocr_indices:
+        images = []
+        try:
+            with timer.stage("rasterize"):
+                images = list(mx.iter_page_images(pdf_path, ocr_indices))
+        except Exception as e:
+            timer.skip("rasterize", str(e))
+            timer.skip("ocr", "no page images")
+        lines = {}
+        for idx, img in images:
+            try:
+                with timer.stage("ocr"):
+                    lines[idx] = mx.ocr_lines(img, lang, None, pdf_path, idx)
+            except Exception as e:
+                timer.skip("ocr", str(e))
+                timer.stages.pop("ocr", None)
+                break
+        with timer.stage("outline"):
+            for idx, page_lines in lines.items():
+                headings[idx] = mx.classify_lines(page_lines, idx)
+
+    with timer.stage("serialize"):
+        outline = mx.finalize_outline([item for idx in sorted(headings) for item in headings[idx]])
+        json.dumps({"title": title, "outline": outline}, indent=2, ensure_ascii=False)
+    return timer
+
+def run_1b_document(pdf_path):
+    # The streaming path round1b_main runs. Its stages interleave page by page,
+    # so each one's time is the sum of its instrumentation events.
+    import instrumentation
+    from document_pipeline import stream_document
+
+    enabled, trace = instrumentation.ENABLED, instrumentation.TRACE
+    instrumentation.configure(True)
+    instrumentation.drain()
+    try:
+        result = stream_document(pdf_path)
+        events, _ = instrumentation.drain()
+    finally:
+        instrumentation.configure(enabled, trace)
+
+    timer = StageTimer()
+    for name, stage in STREAM_STAGES.items():
+        timer.stages[name] = sum(event["wall"] for event in events if event["stage"] == stage)
+    return timer, result["content"]
+
+def run_1b_corpus(pdf_paths, content_datas, scoring):
+    from relevance_ranker import rank_corpus_for_persona
+    from round1b_main import Round1BSolution
+
+    solution = Round1BSolution(os.path.join(ROOT, "Challenge_1B"), scoring=scoring)
+    persona_data = solution.load_persona_data("persona_job_input.json")
+
+    timer = StageTimer()
+    with timer.stage("rank"):
+        ranked = rank_corpus_for_persona(content_datas, persona_data, scoring)
+    with timer.stage("serialize"):
+        aggregator = solution.create_aggregator()
+        for i, (pdf_path, content_data, (ranked_sections, sub_section_analysis)) in enumerate(zip(pdf_paths, content_datas, ranked)):
+            aggregator.add({
+                "pdf_name": os.path.basename(pdf_path),
+                "content": content_data,
+                "ranked_sections": ranked_sections,
+                "sub_section_analysis": sub_section_analysis
+            }, i)
+        json.dumps(solution.build_final_output(aggregator, persona_data), indent=2, ensure_ascii=False)
+    return timer
+
+def document_info(pdf_path, corpus_info):
+    info = dict(corpus_info.get(os.path.basename(pdf_path), {}))
+    if "pages" not in info:
+        with fitz.open(pdf_path) as doc:
+            info["pages"] = len(doc)
+    return info
+
+def benchmark_1a(pdf_paths, corpus_info, repeat):
+    results = []
+    for pdf_path in pdf_paths:
+        stages, skipped = fastest([run_1a(pdf_path) for _ in range(repeat)])
+        results.append({"challenge": "1a", "document": os.path.basename(pdf_path),
+                        **document_info(pdf_path, corpus_info), "stages": stages, "skipped": skipped})
+    return results
+
+def benchmark_1b(pdf_paths, corpus_info, repeat, scoring):
+    results = []
+    content_datas = []
+    for pdf_path in pdf_paths:
+        runs = []
+        for _ in range(repeat):
+            timer, content_data = run_1b_document(pdf_path)
+            runs.append(timer)
+        content_datas.append(content_data)
+        stages, skipped = fastest(runs)
+        results.append({"challenge": "1b", "document": os.path.basename(pdf_path),
+                        **document_info(pdf_path, corpus_info), "stages": stages, "skipped": skipped})
+
+    stages, skipped = fastest([run_1b_corpus(pdf_paths, content_datas, scoring) for _ in range(repeat)])
+    results.append({"challenge": "1b", "document": "*", "documents": len(pdf_paths),
+                    "stages": stages, "skipped": skipped})
+    return results
+
+def stage_totals(results):
+    totals = {}
+    for result in results:
+        challenge = totals.setdefault(result["challenge"], {})
+        for name, seconds in result["stages"].items():
+            challenge[name] = round(challenge.get(name, 0.0) + seconds, 6)
+    return totals
+
+def compare(results, baseline, threshold, min_seconds):
+    # (challenge, document, stage, baseline seconds, current seconds, ratio) for slower
+    # stages; stages shorter than min_seconds in both runs are timer noise and ignored
+    previous = {(r["challenge"], r["document"]): r["stages"] for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old_stages = previous.get((result["challenge"], result["document"]))
+        if not old_stages:
+            continue
+        for name, seconds in result["stages"].items():
+            old = old_stages.get(name)
+            if not old or max(old, seconds) < min_seconds:
+                continue
+            if seconds / old > threshold:
+                regressions.append((result["challenge"], result["document"], name, old, seconds, seconds / old))
+    return regressions
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pymupdf": fitz.VersionBind,
+        "cpu_count": os.cpu_count()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "benchmarks", "corpus"))
+    parser.add_argument("--challenge", nargs="+", choices=["1a", "1b"], default=["1a", "1b"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scoring", choices=["bm25", "legacy"], default="bm25", help="1B ranking mode")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"))
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio reported as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.005, help="ignore stages faster than this")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.corpus, "*.pdf")))
+    if not pdf_paths:
+        print(f"No PDFs in {args.corpus}; run benchmarks/generate_corpus.py first")
+        return 1
+    corpus_info = {}
+    corpus_manifest = os.path.join(args.corpus, "corpus.json")
+    if os.path.exists(corpus_manifest):
+        with open(corpus_manifest, "r", encoding="utf-8") as f:
+            corpus_info = json.load(f)
+
+    results = []
+    if "1a" in args.challenge:
+        results.extend(benchmark_1a(pdf_paths, corpus_info, args.repeat))
+    if "1b" in args.challenge:
+        results.extend(benchmark_1b(pdf_paths, corpus_info, args.repeat, args.scoring))
+
+    report = {
+        "created": datetime.datetime.now().isoformat(),
+        "environment": environment(),
+        "corpus": os.path.abspath(args.corpus),
+        "repeat": args.repeat,
+        "scoring": args.scoring,
+        "totals": stage_totals(results),
+        "results": results
+    }
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report["totals"], indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_seconds)
+        for challenge, document, name, old, new, ratio in regressions:
+            print(f"REGRESSION {challenge} {document} {name}: {old:.4f}s -> {new:.4f}s ({ratio:.2f}x)")
+        if not regressions:
+            print(f"No stage slower than {args.threshold:.2f}x the baseline")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import json
+import logging
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Per-stage wall time, CPU time (of the calling thread, and of child processes
+# such as pdftoppm and the tesseract CLI reaped during the stage), peak resident
+# memory during the stage, resident memory at its end and its change over the
+# stage, plus per-document counters. Shared by Challenge_1A and Challenge_1B. Off unless enabled with --metrics (1B) / METRICS=1;
+# --trace / METRICS_TRACE=1 also writes a Chrome trace (chrome://tracing,
+# Perfetto) next to the outputs.
+ENABLED = os.environ.get("METRICS", "0") == "1"
+TRACE = os.environ.get("METRICS_TRACE", "0") == "1"
+METRICS_FILE = "pipeline_metrics.json"
+TRACE_FILE = "pipeline_trace.json"
+# Pool workers append their events here; the parent merges them in write_report()
+SPOOL_ENV = "METRICS_SPOOL"
+SLOWEST_EVENTS = 20
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+def current_rss_kb() -> int:
+    # Resident set size right now. Where /proc is missing this falls back to
+    # the process's lifetime peak, which only ever grows.
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_KB
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def peak_rss_kb() -> int:
+    # Resident set high-water mark since the last reset_peak_rss(), or the
+    # lifetime peak where /proc is missing
+    try:
+        with open("/proc/self/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def reset_peak_rss() -> None:
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.events = []
+        self.counters = {}
+
+    def _own(self):
+        # A forked worker inherits the parent's events; start it from scratch
+        if self.pid != os.getpid():
+            self._reset()
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        with self.lock:
+            self._own()
+            self.events.append(event)
+
+    def count(self, document: Optional[str], **counts) -> None:
+        with self.lock:
+            self._own()
+            self.counters.setdefault(document or "", Counter()).update(counts)
+
+    def drain(self) -> Tuple[List[Dict[str, Any]], Dict[str, Counter]]:
+        with self.lock:
+            self._own()
+            events, counters = self.events, self.counters
+            self.events, self.counters = [], {}
+        return events, counters
+
+_recorder = Recorder()
+_started = None
+_started_pid = None
+# Running peaks of the stages open in this process. The high-water mark is
+# process-wide, so before a stage resets it every open stage takes its value.
+_peaks_lock = threading.Lock()
+_open_peaks: List[List[int]] = []
+
+def _open_peak() -> List[int]:
+    with _peaks_lock:
+        hwm = peak_rss_kb()
+        for peak in _open_peaks:
+            peak[0] = max(peak[0], hwm)
+        reset_peak_rss()
+        peak = [current_rss_kb()]
+        _open_peaks.append(peak)
+    return peak
+
+def _close_peak(peak: List[int]) -> int:
+    with _peaks_lock:
+        peak[0] = max(peak[0], peak_rss_kb())
+        if peak in _open_peaks:
+            _open_peaks.remove(peak)
+    return peak[0]
+
+def configure(enabled: bool, trace: bool = False) -> None:
+    # Exported so process pool workers inherit the setting
+    global ENABLED, TRACE
+    ENABLED = enabled
+    TRACE = enabled and trace
+    os.environ["METRICS"] = "1" if ENABLED else "0"
+    os.environ["METRICS_TRACE"] = "1" if TRACE else "0"
+
+@contextmanager
+def stage(name: str, document: Optional[str] = None):
+    if not ENABLED:
+        yield
+        return
+    # Memory is read outside the timed span so it does not count towards the stage
+    peak = _open_peak()
+    rss_start = peak[0]
+    start = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    child_cpu_start = children_cpu()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        child_cpu = children_cpu() - child_cpu_start
+        peak_rss = _close_peak(peak)
+        rss = current_rss_kb()
+        _recorder.add_event({
+            "stage": name,
+            "document": document or "",
+            "start": start,
+            "wall": wall,
+            "cpu": cpu,
+            "child_cpu": child_cpu,
+            "peak_rss_kb": peak_rss,
+            "rss_kb": rss,
+            "rss_delta_kb": rss - rss_start,
+            "pid": os.getpid(),
+            "tid": threading.get_ident()
+        })
+
+def count(document: Optional[str] = None, **counts) -> None:
+    if ENABLED:
+        _recorder.count(document, **counts)
+
+def drain() -> Tuple[List[Dict[str, Any]], Dict[str, Counter]]:
+    # Events and counters recorded in this process so far, which are cleared
+    return _recorder.drain()
+
+def flush() -> None:
+    # Called at the end of every pool work unit; a no-op in the main process
+    spool = os.environ.get(SPOOL_ENV)
+    if not ENABLED or not spool or os.getpid() == _started_pid:
+        return
+    events, counters = _recorder.drain()
+    if not events and not counters:
+        return
+    path = os.path.join(spool, f"events-{os.getpid()}.jsonl")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"events": events, "counters": counters}, ensure_ascii=False) + "\n")
+
+def work_unit(func: Callable) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            flush()
+    return wrapper
+
+def start() -> None:
+    # Call in the main process before creating any pool
+    global _started, _started_pid
+    if not ENABLED:
+        return
+    _started = time.time()
+    _started_pid = os.getpid()
+    os.environ[SPOOL_ENV] = tempfile.mkdtemp(prefix="metrics-")
+
+def _collect() -> Tuple[List[Dict[str, Any]], Dict[str, Counter]]:
+    events, counters = _recorder.drain()
+    counters = {document: Counter(values) for document, values in counters.items()}
+    spool = os.environ.pop(SPOOL_ENV, None)
+    if spool and os.path.isdir(spool):
+        for name in sorted(os.listdir(spool)):
+            with open(os.path.join(spool, name), "r", encoding="utf-8") as f:
+                for line in f:
+                    batch = json.loads(line)
+                    events.extend(batch["events"])
+                    for document, values in batch["counters"].items():
+                        counters.setdefault(document, Counter()).update(values)
+        shutil.rmtree(spool, ignore_errors=True)
+    events.sort(key=lambda event: event["start"])
+    return events, counters
+
+def _summarize(events: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    stages = {}
+    for event in events:
+        summary = stages.setdefault(event["stage"], {"count": 0, "wall": 0.0, "cpu": 0.0, "child_cpu": 0.0,
+                                                     "max_wall": 0.0, "max_peak_rss_kb": 0, "max_rss_kb": 0,
+                                                     "max_rss_delta_kb": None})
+        summary["count"] += 1
+        summary["wall"] += event["wall"]
+        summary["cpu"] += event["cpu"]
+        summary["child_cpu"] += event["child_cpu"]
+        summary["max_wall"] = max(summary["max_wall"], event["wall"])
+        summary["max_peak_rss_kb"] = max(summary["max_peak_rss_kb"], event["peak_rss_kb"])
+        summary["max_rss_kb"] = max(summary["max_rss_kb"], event["rss_kb"])
+        if summary["max_rss_delta_kb"] is None or event["rss_delta_kb"] > summary["max_rss_delta_kb"]:
+            summary["max_rss_delta_kb"] = event["rss_delta_kb"]
+    for summary in stages.values():
+        for key in ("wall", "cpu", "child_cpu", "max_wall"):
+            summary[key] = round(summary[key], 6)
+    return stages
+
+def build_report(events: List[Dict[str, Any]], counters: Dict[str, Counter]) -> Dict[str, Any]:
+    by_document = {}
+    for event in events:
+        by_document.setdefault(event["document"], []).append(event)
+    documents = {}
+    for document in sorted(set(by_document) | set(counters)):
+        documents[document] = {
+            "stages": _summarize(by_document.get(document, [])),
+            "counters": dict(counters.get(document, {}))
+        }
+    slowest = sorted(events, key=lambda event: event["wall"], reverse=True)[:SLOWEST_EVENTS]
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "wall_seconds": round(time.time() - _started, 6) if _started else None,
+        "stages": _summarize(events),
+        "documents": documents,
+        "slowest": [{key: event[key] for key in ("stage", "document", "wall", "cpu", "child_cpu", "peak_rss_kb", "rss_kb", "rss_delta_kb")} for event in slowest]
+    }
+
+def build_trace(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    origin = events[0]["start"] if events else 0.0
+    return {"traceEvents": [{
+        "name": event["stage"],
+        "cat": "pipeline",
+        "ph": "X",
+        "ts": round((event["start"] - origin) * 1e6),
+        "dur": round(event["wall"] * 1e6),
+        "pid": event["pid"],
+        "tid": event["tid"],
+        "args": {key: event[key] for key in ("document", "cpu", "child_cpu", "peak_rss_kb", "rss_kb", "rss_delta_kb")}
+    } for event in events]}
+
+def write_report(output_dir: str, log: Callable[[str], None] = logging.info) -> Optional[str]:
+    if not ENABLED:
+        return None
+    events, counters = _collect()
+    os.makedirs(output_dir, exist_ok=True)
+    metrics_path = os.path.join(output_dir, METRICS_FILE)
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(build_report(events, counters), f, indent=2, ensure_ascii=False)
+    log(f"Metrics saved to: {metrics_path}")
+    if TRACE:
+        trace_path = os.path.join(output_dir, TRACE_FILE)
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump(build_trace(events), f)
+        log(f"Trace saved to: {trace_path}")
+    return metrics_path
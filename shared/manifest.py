@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Per-input record of what was last produced from each PDF, keyed by name and
+# checked by size, mtime and SHA-256. Shared by Challenge_1A (incremental runs
+# and the outline index 1B reads) and Challenge_1B (the document store).
+HASH_CHUNK = 1 << 20
+# Version of Challenge_1A's outlines. 1A's pipeline version starts with it and
+# 1B only reuses 1A outlines written under the same one; bump it when a change
+# alters the outlines 1A produces for unchanged inputs.
+OUTLINE_VERSION = 2
+
+def outline_version(pipeline_version: str) -> str:
+    return str(pipeline_version).split(":")[0]
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_json(path: str, data: Any, indent: Optional[int] = None) -> None:
+    # Written next to the target and renamed over it, so readers never see half a file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+class Manifest:
+    # {"pipeline_version": ..., "files": {name: {"sha256", "size", "mtime_ns", ...}}}.
+    # Entries written under another pipeline version are discarded on load.
+    def __init__(self, path: str, pipeline_version: str, log: Callable[[str], None] = logging.warning):
+        self.path = path
+        self.pipeline_version = pipeline_version
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("pipeline_version") == pipeline_version:
+                self.entries = data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            log(f"Ignoring unreadable manifest {path}: {e}")
+
+    def _digest(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._digests:
+            self._digests[key] = file_digest(path)
+        return self._digests[key]
+
+    def lookup(self, name: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # Stored entry when the file at `path` (default: `name`) is unchanged,
+        # else None. Size and mtime matching is trusted; otherwise the content
+        # hash decides (a touched but identical file keeps its entry).
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path or name)
+        except OSError:
+            return None
+        if entry["size"] != stat.st_size:
+            return None
+        if entry["mtime_ns"] != stat.st_mtime_ns:
+            if entry["sha256"] != self._digest(path or name, stat):
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+        return entry
+
+    def record(self, name: str, path: Optional[str] = None, **data) -> Dict[str, Any]:
+        stat = os.stat(path or name)
+        entry = self.entries[name] = {
+            "sha256": self._digest(path or name, stat),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            **data
+        }
+        return entry
+
+    def prune(self, names: Iterable[str]) -> None:
+        names = set(names)
+        for name in [name for name in self.entries if name not in names]:
+            del self.entries[name]
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_json(self.path, {"pipeline_version": self.pipeline_version, "files": self.entries}, indent=2)